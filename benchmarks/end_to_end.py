@@ -0,0 +1,199 @@
+"""
+Measures common operations end to end, over HTTP, against the stand-in
+server in benchmarks.fake_server, which is run in a separate process so that
+it doesn't count towards the memory used here.
+
+The benchmarks are:
+
+get_rows
+    Fetching every row of a list.
+save
+    Changing a field on every row and saving the list.
+as_xml
+    Exporting a list, with field definitions and rows, as XML.
+users
+    Resolving account names to users, and then fetching users by ID.
+cli
+    Running ``sharepoint exportlists`` in a new process.
+
+For each, the time taken, the throughput, the number of requests made and
+the peak memory used are reported. Each benchmark runs in a new process, and
+peak memory is that process's maximum resident set size (or for cli, that
+of the sharepoint process), which includes memory used by lxml.
+
+Run from the top of the source tree with::
+
+    $ python -m benchmarks.end_to_end [--rows N] [--width N] [--latency S] [--jobs N] [benchmark ...]
+"""
+
+from __future__ import print_function
+
+import json
+import optparse
+import os
+import subprocess
+import sys
+import time
+
+from lxml import etree
+
+from sharepoint import SharePointSite, basic_auth_opener
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def format_result(name, seconds, items, unit, requests=None, peak_memory=None):
+    return '{0:<10} {1:>9.3f} {2:>12.0f} {3:<8} {4:>9} {5:>10}'.format(
+        name, seconds, items / seconds, unit + '/s',
+        '-' if requests is None else requests,
+        '-' if peak_memory is None else '{0:.1f}'.format(peak_memory / 1e6))
+
+
+def max_rss(who='self'):
+    """
+    Returns the maximum resident set size of this process (or of its
+    children) in bytes, or None if that isn't known.
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # Bytes on macOS, kilobytes elsewhere
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+def start_server(rows, width, latency, users):
+    """
+    Starts the stand-in server, returning the process and its URL.
+    """
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.fake_server',
+                                '--rows', str(rows), '--width', str(width),
+                                '--latency', str(latency), '--users', str(users)],
+                               stdout=subprocess.PIPE)
+    url = process.stdout.readline().decode('ascii').strip()
+    if not url:
+        raise RuntimeError("The stand-in server didn't start")
+    return process, url
+
+
+def make_site(url, jobs):
+    return SharePointSite(url, basic_auth_opener(url, 'user', 'password'), max_workers=jobs)
+
+
+def measure(name, unit, site, func):
+    """
+    Calls func(), returning the result for the number of items it returns.
+    """
+    requests_before = sum(stats['count'] for stats in site.stats().values())
+    start = time.time()
+    items = func()
+    seconds = time.time() - start
+    requests = sum(stats['count'] for stats in site.stats().values()) - requests_before
+    return dict(name=name, seconds=seconds, items=items, unit=unit,
+                requests=requests, peak_memory=max_rss())
+
+
+def bench_get_rows(url, options):
+    site = make_site(url, options.jobs)
+    sp_list = site.lists['List1']
+    sp_list.fields
+    return measure('get_rows', 'rows', site, lambda: len(sp_list.get_rows()))
+
+
+def bench_save(url, options):
+    site = make_site(url, options.jobs)
+    sp_list = site.lists['List1']
+    rows = sp_list.rows
+    for row in rows:
+        row.Text0 = 'Changed text for row {0}'.format(row.id)
+    return measure('save', 'rows', site, lambda: len(sp_list.save().saved))
+
+
+def bench_as_xml(url, options):
+    site = make_site(url, options.jobs)
+    site.lists['List1'].fields
+
+    def export():
+        xml = site.as_xml(list_names=['List1'])
+        etree.tostring(xml)
+        return options.rows
+    return measure('as_xml', 'rows', site, export)
+
+
+def bench_users(url, options):
+    site = make_site(url, options.jobs)
+    account_names = ['EXAMPLE\\user{0}'.format(i) for i in range(0, options.users, 2)]
+    user_ids = range(1, options.users, 2)
+
+    def resolve():
+        site.users.resolve_principals(account_names)
+        site.users.get_many(user_ids)
+        return len(account_names) + len(user_ids)
+    return measure('users', 'users', site, resolve)
+
+
+def bench_cli(url, options):
+    command = [sys.executable, '-m', 'sharepoint.cmd', 'exportlists', '-s', url,
+               '-u', 'user', '-p', 'password', '-l', 'List1', '--jobs', str(options.jobs)]
+    start = time.time()
+    with open(os.devnull, 'wb') as devnull:
+        subprocess.check_call(command, stdout=devnull)
+    seconds = time.time() - start
+    return dict(name='cli', seconds=seconds, items=options.rows, unit='rows',
+                peak_memory=max_rss('children'))
+
+
+BENCHMARKS = [('get_rows', bench_get_rows),
+              ('save', bench_save),
+              ('as_xml', bench_as_xml),
+              ('users', bench_users),
+              ('cli', bench_cli)]
+
+
+def run_in_worker(name, url, argv):
+    """
+    Runs a benchmark in a new process, returning its result.
+    """
+    output = subprocess.check_output([sys.executable, '-m', 'benchmarks.end_to_end',
+                                      '--worker', name, '--url', url] + argv)
+    return json.loads(output.decode('utf-8'))
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options] [benchmark ...]')
+    parser.add_option('--rows', type='int', default=10000, help='Rows in the list (default 10000)')
+    parser.add_option('--width', type='int', default=20, help='Fields in the list (default 20)')
+    parser.add_option('--users', type='int', default=500, help='Users on the site (default 500)')
+    parser.add_option('--latency', type='float', default=0.01,
+                      help='Seconds the server takes to answer each request (default 0.01)')
+    parser.add_option('--jobs', type='int', default=4, help="The site's max_workers (default 4)")
+    # Used to run each benchmark in its own process
+    parser.add_option('--worker', help=optparse.SUPPRESS_HELP)
+    parser.add_option('--url', help=optparse.SUPPRESS_HELP)
+    options, args = parser.parse_args()
+
+    if options.worker:
+        print(json.dumps(dict(BENCHMARKS)[options.worker](options.url, options)))
+        return
+
+    names = args or [name for name, func in BENCHMARKS]
+    argv = ['--rows', str(options.rows), '--users', str(options.users), '--jobs', str(options.jobs)]
+    process, url = start_server(options.rows, options.width, options.latency, options.users)
+    try:
+        print("{0} rows, {1} fields, {2} users, {3}s latency, {4} jobs".format(
+            options.rows, options.width, options.users, options.latency, options.jobs))
+        print('{0:<10} {1:>9} {2:>21} {3:>9} {4:>10}'.format('benchmark', 'seconds', 'throughput',
+                                                             'requests', 'peak MB'))
+        for name, func in BENCHMARKS:
+            if name in names:
+                print(format_result(**run_in_worker(name, url, argv)))
+                sys.stdout.flush()
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+    main()
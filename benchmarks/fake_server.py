@@ -0,0 +1,289 @@
+"""
+A stand-in for a SharePoint site, serving synthetic lists and users over HTTP
+for the benchmarks to run against.
+
+It implements, from Lists.asmx, GetListCollection, GetList, GetListItems
+(with paging, ViewFields and IncludeAttachmentUrls, but ignoring any Query),
+UpdateListItems and GetAttachmentCollection; ResolvePrincipals from
+People.asmx; the UserInformationList endpoint of ListData.svc, by ID or with
+an 'Id eq ...' $filter; and attachment downloads. Each request is delayed by
+latency seconds, as if it had come from a real server.
+
+Run on its own with::
+
+    $ python -m benchmarks.fake_server [--rows N] [--lists N] [--width N] [--latency S]
+
+It prints its URL, then serves until it's killed.
+"""
+
+from __future__ import print_function
+
+import collections
+import optparse
+import re
+import sys
+import threading
+import time
+
+from lxml import etree
+from lxml.builder import ElementMaker
+
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import unquote, urlsplit
+
+from sharepoint.xml import SP, namespaces, soap_body
+
+from .row_memory import SAMPLE_VALUES, widen
+
+RS = ElementMaker(namespace=namespaces['rs'], nsmap=namespaces)
+Z = ElementMaker(namespace=namespaces['z'], nsmap=namespaces)
+ATOM = ElementMaker(namespace='http://www.w3.org/2005/Atom', nsmap={None: 'http://www.w3.org/2005/Atom',
+                                                                   'd': namespaces['d'], 'm': namespaces['m']})
+D = ElementMaker(namespace=namespaces['d'], nsmap=namespaces)
+M = ElementMaker(namespace=namespaces['m'], nsmap=namespaces)
+
+USER_INFO_LIST_ID = '{00000000-0000-0000-0000-0000000000ff}'
+
+# Every tenth row has an attachment
+VALUES = dict(SAMPLE_VALUES, Attachments=lambda i: '1' if i % 10 == 0 else '0')
+
+
+class FakeList(object):
+    def __init__(self, list_id, title, field_types, rows):
+        self.id, self.title, self.field_types = list_id, title, field_types
+        self.rows = collections.OrderedDict((int(row['ows_ID']), row) for row in rows)
+        self.version = 1
+
+    def element(self, with_fields=True):
+        element = SP.List(ID=self.id, Title=self.title, Version=str(self.version),
+                          Modified='2014-01-02 03:04:05', ItemCount=str(len(self.rows)),
+                          EnableModeration='False', RootFolder='/Lists/' + self.title)
+        if with_fields:
+            fields = SP.Fields()
+            for name, type_name in self.field_types:
+                field = SP.Field(Name=name, DisplayName=name, Type=type_name)
+                if type_name == 'Lookup':
+                    field.attrib['List'] = self.id
+                fields.append(field)
+            element.append(fields)
+        return element
+
+
+class FakeSite(object):
+    """
+    The lists and users of the stand-in site.
+
+    Each of list_count lists has row_count rows with width fields, drawn from
+    the mix in benchmarks.row_memory. Every tenth row has an attachment of
+    attachment_size bytes. There are user_count users, whose IDs are those
+    that rows refer to.
+    """
+
+    def __init__(self, row_count=10000, list_count=1, width=20, user_count=500, attachment_size=10000):
+        field_types = widen(width) + [('Attachments', 'Attachments')]
+        self.lists = []
+        for n in range(list_count):
+            list_id = '{{00000000-0000-0000-0000-{0:012x}}}'.format(n + 1)
+            rows = (dict(('ows_' + name, VALUES[type_name](i)) for name, type_name in field_types)
+                    for i in range(1, row_count + 1))
+            self.lists.append(FakeList(list_id, 'List{0}'.format(n + 1), field_types, rows))
+        self.users = collections.OrderedDict(
+            (i, {'Id': str(i), 'Name': 'User {0}'.format(i), 'Account': 'EXAMPLE\\user{0}'.format(i),
+                 'WorkEMail': 'user{0}@example.org'.format(i)})
+            for i in range(user_count))
+        self.user_info_list = FakeList(USER_INFO_LIST_ID, 'User Information List',
+                                       [('ID', 'Counter'), ('Title', 'Text'), ('Name', 'Text')],
+                                       ({'ows_ID': user['Id'], 'ows_Title': user['Name'],
+                                         'ows_Name': user['Account']} for user in self.users.values()))
+        self.attachment_size = attachment_size
+        self._update_lock = threading.Lock()
+
+    def get_list(self, name):
+        if name == 'UserInfo':
+            return self.user_info_list
+        for fake_list in self.lists + [self.user_info_list]:
+            if name.strip('{}').lower() == fake_list.id.strip('{}').lower() or name == fake_list.title:
+                return fake_list
+        raise KeyError(name)
+
+    # Lists.asmx
+
+    def GetListCollection(self, xml, base_url):
+        return SP.GetListCollectionResponse(SP.GetListCollectionResult(
+            SP.Lists(*(fake_list.element(with_fields=False) for fake_list in self.lists))))
+
+    def GetList(self, xml, base_url):
+        fake_list = self.get_list(xml.findtext('sp:listName', namespaces=namespaces))
+        return SP.GetListResponse(SP.GetListResult(fake_list.element()))
+
+    def GetListItems(self, xml, base_url):
+        fake_list = self.get_list(xml.findtext('sp:listName', namespaces=namespaces))
+        row_limit = int(xml.findtext('sp:rowLimit', namespaces=namespaces) or 100)
+        keys = set('ows_' + field_ref.get('Name') for field_ref in xml.iter('FieldRef')) | {'ows_ID'}
+        attachment_urls = xml.findtext('.//IncludeAttachmentUrls') == 'TRUE'
+        start = 0
+        for paging in xml.iter('Paging'):
+            start = int(re.search(r'p_ID=(\d+)', paging.get('ListItemCollectionPositionNext')).group(1))
+
+        data = RS.data()
+        last_id = None
+        for row_id, row in fake_list.rows.items():
+            if row_id <= start:
+                continue
+            if len(data) == row_limit:
+                data.attrib['ListItemCollectionPositionNext'] = 'Paged=TRUE&p_ID={0}'.format(last_id)
+                break
+            attrib = dict((key, value) for key, value in row.items() if key in keys)
+            if attachment_urls and attrib.get('ows_Attachments') == '1':
+                attrib['ows_Attachments'] = ';#{0};#'.format(self.attachment_url(fake_list, row_id, base_url))
+            data.append(Z.row(**attrib))
+            last_id = row_id
+        data.attrib['ItemCount'] = str(len(data))
+        return SP.GetListItemsResponse(SP.GetListItemsResult(SP.listitems(data)))
+
+    def UpdateListItems(self, xml, base_url):
+        with self._update_lock:
+            return self._update_list_items(xml)
+
+    def _update_list_items(self, xml):
+        fake_list = self.get_list(xml.findtext('sp:listName', namespaces=namespaces))
+        results = SP.Results()
+        for method in xml.iter('Method'):
+            values = dict(('ows_' + field.get('Name'), field.text or '') for field in method.iter('Field'))
+            command = method.get('Cmd')
+            if command == 'New':
+                row_id = max(fake_list.rows or [0]) + 1
+                values['ows_ID'] = str(row_id)
+                fake_list.rows[row_id] = values
+            else:
+                row_id = int(values['ows_ID'])
+                if row_id not in fake_list.rows:
+                    results.append(SP.Result(SP.ErrorCode('0x81020016'), SP.ErrorText('Item does not exist'),
+                                             ID='{0},{1}'.format(method.get('ID'), command)))
+                    continue
+                if command == 'Delete':
+                    del fake_list.rows[row_id]
+                else:
+                    fake_list.rows[row_id].update(values)
+            result = SP.Result(SP.ErrorCode('0x00000000'), ID='{0},{1}'.format(method.get('ID'), command))
+            if command != 'Delete':
+                result.append(Z.row(**fake_list.rows[row_id]))
+            results.append(result)
+        fake_list.version += 1
+        return SP.UpdateListItemsResponse(SP.UpdateListItemsResult(results))
+
+    def GetAttachmentCollection(self, xml, base_url):
+        fake_list = self.get_list(xml.findtext('sp:listName', namespaces=namespaces))
+        row_id = int(xml.findtext('sp:listItemID', namespaces=namespaces))
+        attachments = SP.Attachments()
+        if fake_list.rows.get(row_id, {}).get('ows_Attachments') == '1':
+            attachments.append(SP.Attachment(self.attachment_url(fake_list, row_id, base_url)))
+        return SP.GetAttachmentCollectionResponse(SP.GetAttachmentCollectionResult(attachments))
+
+    def attachment_url(self, fake_list, row_id, base_url):
+        return '{0}Lists/{1}/Attachments/{2}/attachment.bin'.format(base_url, fake_list.title, row_id)
+
+    # People.asmx
+
+    def ResolvePrincipals(self, xml, base_url):
+        users_by_account = dict((user['Account'], user) for user in self.users.values())
+        result = SP.ResolvePrincipalsResult()
+        for key in xml.iterfind('sp:principalKeys/sp:string', namespaces=namespaces):
+            user = users_by_account.get(key.text)
+            result.append(SP.PrincipalInfo(SP.AccountName(key.text),
+                                           SP.UserInfoID(user['Id'] if user else '-1'),
+                                           SP.DisplayName(user['Name'] if user else key.text)))
+        return SP.ResolvePrincipalsResponse(result)
+
+    # ListData.svc
+
+    def user_entry(self, user):
+        properties = M.properties(*(getattr(D, name)(value) for name, value in user.items()))
+        properties[0].set('{{{0}}}type'.format(namespaces['m']), 'Edm.Int32')
+        return ATOM.entry(ATOM.content(properties, type='application/xml'))
+
+    def get_users(self, path, query):
+        """
+        Returns the Atom for a user or users, or None if a single user doesn't
+        exist.
+        """
+        match = re.search(r'UserInformationList\((\d+)\)$', path)
+        if match:
+            user = self.users.get(int(match.group(1)))
+            return self.user_entry(user) if user else None
+        ids = [int(user_id) for user_id in re.findall(r'Id eq (\d+)', unquote(query))]
+        return ATOM.feed(*(self.user_entry(self.users[user_id]) for user_id in ids if user_id in self.users))
+
+
+def make_handler(site, latency):
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def respond(self, status, body=b'', content_type='text/xml; charset=utf-8'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def base_url(self):
+            return 'http://{0}/'.format(self.headers['Host'])
+
+        def do_POST(self):
+            time.sleep(latency)
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            xml = etree.fromstring(body).xpath('/soap:Envelope/soap:Body/*', namespaces=namespaces)[0]
+            method = getattr(site, etree.QName(xml).localname, None)
+            if method is None:
+                self.respond(500, b'Not implemented')
+                return
+            self.respond(200, etree.tostring(soap_body(method(xml, self.base_url()))))
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlsplit(self.path)
+            if '/Attachments/' in url.path:
+                self.respond(200, b'\0' * site.attachment_size, 'application/octet-stream')
+                return
+            atom = site.get_users(url.path, url.query)
+            if atom is None:
+                self.respond(404)
+            else:
+                self.respond(200, etree.tostring(atom), 'application/atom+xml')
+
+    return Handler
+
+
+class FakeServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def serve(site, port=0, latency=0.0):
+    """
+    Returns a server for site, listening on localhost.
+    """
+    return FakeServer(('127.0.0.1', port), make_handler(site, latency))
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--rows', type='int', default=10000)
+    parser.add_option('--lists', type='int', default=1)
+    parser.add_option('--width', type='int', default=20)
+    parser.add_option('--users', type='int', default=500)
+    parser.add_option('--latency', type='float', default=0.0, help='Seconds to delay each request by')
+    parser.add_option('--port', type='int', default=0)
+    options, args = parser.parse_args()
+
+    site = FakeSite(options.rows, options.lists, options.width, options.users)
+    server = serve(site, options.port, options.latency)
+    print('http://127.0.0.1:{0}/'.format(server.server_address[1]))
+    sys.stdout.flush()
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Measures how long it takes to decode the rows of a wide list.
+
+Each row is decoded twice: once with Field.parse() for each field, and once by
+loading it into the list's Row class and reading every field back, which uses
+the parsers compiled for the list.
+
+Run from the top of the source tree with::
+
+    $ python -m benchmarks.row_decoding [row_count] [width]
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from sharepoint.lists import SharePointLists, SharePointList
+from sharepoint.xml import SP
+
+from .row_memory import SAMPLE_VALUES, LIST_ID, widen
+
+
+def make_list(width):
+    field_types = widen(width)
+    fields = SP.Fields()
+    for name, type_name in field_types:
+        field = SP.Field(Name=name, DisplayName=name, Type=type_name)
+        if type_name == 'Lookup':
+            field.attrib['List'] = LIST_ID
+        fields.append(field)
+    settings = SP.List(fields, ID=LIST_ID, Title='Benchmark')
+    return SharePointList(None, SharePointLists(None), settings), field_types
+
+
+def make_attrib(field_types, i):
+    return dict(('ows_' + name, SAMPLE_VALUES[type_name](i)) for name, type_name in field_types)
+
+
+def main(row_count=20000, width=60):
+    sp_list, field_types = make_list(width)
+    attribs = [make_attrib(field_types, i) for i in range(1, row_count + 1)]
+    fields = list(sp_list.fields.values())
+    Row = sp_list.Row
+
+    start = time.time()
+    for attrib in attribs:
+        for field in fields:
+            field.parse(attrib)
+    generic = (time.time() - start) / row_count
+
+    names = [field.name for field in fields]
+    start = time.time()
+    for attrib in attribs:
+        row = Row(attrib=attrib)
+        for name in names:
+            try:
+                row._get(name)
+            except KeyError:
+                pass
+    compiled = (time.time() - start) / row_count
+
+    print("{0} rows, {1} fields".format(row_count, width))
+    print("Field.parse(): {0:8.1f} us/row".format(generic * 1e6))
+    print("Row class:     {0:8.1f} us/row ({1:.1f}x)".format(compiled * 1e6, generic / compiled))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
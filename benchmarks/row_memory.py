@@ -0,0 +1,122 @@
+"""
+Measures the memory used by the rows of a large list, as they're stored now
+and as they used to be stored, with every field decoded up front into a
+dict. The attribute values that rows keep are counted too.
+
+Run from the top of the source tree with::
+
+    $ python -m benchmarks.row_memory [row_count]
+"""
+
+from __future__ import print_function
+
+import sys
+import tracemalloc
+
+from sharepoint.lists import SharePointLists, SharePointList
+from sharepoint.xml import SP
+
+LIST_ID = '{00000000-0000-0000-0000-000000000001}'
+
+# A field mix typical of a wide custom list
+FIELD_TYPES = ([('ID', 'Counter'), ('Title', 'Text'), ('Modified', 'DateTime'), ('Created', 'DateTime'),
+                ('Author', 'User'), ('Editor', 'User')] +
+               [('Text{0}'.format(i), 'Text') for i in range(6)] +
+               [('Number{0}'.format(i), 'Number') for i in range(4)] +
+               [('Choice{0}'.format(i), 'Choice') for i in range(2)] +
+               [('Lookup{0}'.format(i), 'Lookup') for i in range(2)])
+
+SAMPLE_VALUES = {
+    'Counter': lambda i: str(i),
+    'Text': lambda i: 'Some text for row {0}'.format(i),
+    'DateTime': lambda i: '2014-01-02 03:04:05',
+    'User': lambda i: '{0};#User {0}'.format(i % 500),
+    'Number': lambda i: '{0}.5'.format(i),
+    'Choice': lambda i: 'Choice {0}'.format(i % 5),
+    'Lookup': lambda i: '{0};#Item {0}'.format(i % 1000),
+}
+
+
+def widen(width):
+    """
+    Returns the field mix repeated to make width fields, with the repeats
+    given new names.
+    """
+    return [(name if i < len(FIELD_TYPES) else '{0}_{1}'.format(name, i), type_name)
+            for i, (name, type_name) in enumerate(FIELD_TYPES * (width // len(FIELD_TYPES) + 1))][:width]
+
+
+def make_list():
+    fields = SP.Fields()
+    for name, type_name in FIELD_TYPES:
+        field = SP.Field(Name=name, DisplayName=name, Type=type_name)
+        if type_name == 'Lookup':
+            field.attrib['List'] = LIST_ID
+        fields.append(field)
+    settings = SP.List(fields, ID=LIST_ID, Title='Benchmark')
+    return SharePointList(None, SharePointLists(None), settings)
+
+
+def make_attrib(i):
+    return dict(('ows_' + name, SAMPLE_VALUES[type_name](i)) for name, type_name in FIELD_TYPES)
+
+
+class DictRow(object):
+    """
+    A row as rows used to be stored, with every field decoded when it's
+    loaded into a dict.
+    """
+
+    def __init__(self, fields, attrib):
+        self._data = {}
+        self._changed = set()
+        for field in fields.values():
+            value = field.parse(attrib)
+            if value is not None:
+                self._data[field.name] = value
+        self.id = self._data.get('ID')
+
+
+def measure(make_row, decode, row_count):
+    """
+    Returns the memory used by row_count rows once they've been made from
+    their attributes with make_row, and once they've been decoded.
+    """
+    tracemalloc.start()
+    attribs = [make_attrib(i) for i in range(1, row_count + 1)]
+    rows = [make_row(attrib) for attrib in attribs]
+    # Rows keep only the parts of the attributes they need
+    del attribs
+    loaded = tracemalloc.get_traced_memory()[0]
+    for row in rows:
+        decode(row)
+    decoded = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return loaded, decoded
+
+
+def main(row_count=100000):
+    sp_list = make_list()
+    Row, fields = sp_list.Row, sp_list.fields
+
+    def decode(row):
+        for name in fields:
+            try:
+                row._get(name)
+            except KeyError:
+                pass
+
+    before = measure(lambda attrib: DictRow(fields, attrib), lambda row: None, row_count)
+    after = measure(lambda attrib: Row(attrib=attrib), decode, row_count)
+
+    print("{0} rows, {1} fields".format(row_count, len(FIELD_TYPES)))
+    print("{0:<10} {1:>20} {2:>20}".format('', 'loaded', 'decoded'))
+    for label, (loaded, decoded) in (('dict rows', before), ('slot rows', after)):
+        print("{0:<10} {1:8.1f} MB {2:5.0f} B/row {3:8.1f} MB {4:5.0f} B/row".format(
+            label, loaded / 1e6, loaded / row_count, decoded / 1e6, decoded / row_count))
+    print("Slot rows use {0:.0%} of the memory of dict rows when loaded, and {1:.0%} once decoded".format(
+        after[0] / float(before[0]), after[1] / float(before[1])))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
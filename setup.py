@@ -1,3 +1,6 @@
+import sys
+
+from distutils.command.build_py import build_py
 from distutils.core import setup
 
 __version__ = '0.4.2'
@@ -5,6 +8,16 @@ __version__ = '0.4.2'
 packages = ['sharepoint',
             'sharepoint.lists']
 
+
+class BuildPy(build_py):
+    def find_package_modules(self, package, package_dir):
+        modules = build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 6):
+            # sharepoint.aio uses async generators, which older versions of
+            # Python can't even compile
+            modules = [module for module in modules if module[:2] != ('sharepoint', 'aio')]
+        return modules
+
 setup(name='sharepoint',
       description='Module and command-line utility to get data out of SharePoint',
       long_description=open('README.rst').read(),
@@ -12,6 +25,7 @@ setup(name='sharepoint',
       author_email='opendata@oucs.ox.ac.uk',
       version=__version__,
       packages=packages,
+      cmdclass={'build_py': BuildPy},
       scripts=['bin/sharepoint'],
       url='https://github.com/ox-it/python-sharepoint',
       classifiers=['Development Status :: 4 - Beta',
@@ -23,5 +37,5 @@ setup(name='sharepoint',
                    'Topic :: Internet :: WWW/HTTP',
                    'Topic :: Office/Business :: Groupware'],
       keywords=['SharePoint'],
-      install_requires=['lxml', 'six'])
+      install_requires=['lxml', 'six', 'futures; python_version < "3"'])
 
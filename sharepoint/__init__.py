@@ -1,5 +1,7 @@
 from .auth import basic_auth_opener
 from .site import SharePointSite
+from .transport import ConnectionPool, KeepAliveHandler
+from .users import UserCaches
 
 __version__ = '0.4.2'
 
@@ -0,0 +1,450 @@
+"""
+An asyncio interface to SharePoint sites.
+
+This mirrors SharePointSite, SharePointLists, SharePointList and
+SharePointUsers, but anything that makes a request is a coroutine. Requests
+are made with an aiohttp ClientSession, which you'll need to install aiohttp
+for::
+
+    session = basic_auth_session(site_url, 'username', 'password')
+    site = AsyncSharePointSite(site_url, session)
+
+    sp_list = await site.lists.get('ListName')
+    for row in await sp_list.get_rows():
+        print(row.id, row.FieldName)
+
+Rows are SharePointListRow objects like those returned by SharePointList, and
+are decoded in the same way. Lookups between lists can only be followed to
+rows that have already been fetched, with get_rows() on the other list or
+with prefetch_lookups().
+"""
+
+import asyncio
+import collections
+import functools
+import itertools
+
+from lxml import etree
+
+from six.moves.urllib.parse import urljoin
+
+from .cache import missing
+from .exceptions import SharePointException
+from .lists import SharePointLists, SharePointList, SharePointListRow, SaveResult, caml
+from .lists.definitions import LIST_WEBSERVICE
+from .lists.moderation import Moderation
+from .users import SharePointUser, UserCaches, USER_PATH
+from .xml import SP, soap_body, namespaces
+
+
+def basic_auth_session(url, username, password, limit=100):
+    """
+    Returns an aiohttp ClientSession that authenticates with HTTP basic auth,
+    making at most limit connections at once.
+    """
+    import aiohttp
+    return aiohttp.ClientSession(auth=aiohttp.BasicAuth(username, password),
+                                 connector=aiohttp.TCPConnector(limit=limit))
+
+
+class AsyncSharePointSite(object):
+    def __init__(self, url, session, timeout=None, user_caches=None):
+        """
+        user_caches is a UserCaches, for looking up users, as for
+        SharePointSite.
+        """
+        if not url.endswith('/'):
+            url += '/'
+
+        self.session = session
+        self.base_url = url
+        self.relative = functools.partial(urljoin, url)
+        self.timeout = timeout
+        self.user_caches = user_caches if user_caches is not None else UserCaches()
+
+    def _request_kwargs(self):
+        if self.timeout is None:
+            return {}
+        import aiohttp
+        return {'timeout': aiohttp.ClientTimeout(total=self.timeout)}
+
+    async def post_soap(self, url, xml, soapaction=None):
+        url = self.relative(url)
+        headers = {'Content-type': 'text/xml; charset=utf-8'}
+        if soapaction:
+            headers['Soapaction'] = soapaction
+        async with self.session.post(url, data=etree.tostring(soap_body(xml)),
+                                     headers=headers, **self._request_kwargs()) as response:
+            response.raise_for_status()
+            body = await response.read()
+        return etree.fromstring(body).xpath('/soap:Envelope/soap:Body/*', namespaces=namespaces)[0]
+
+    async def open(self, url):
+        """
+        Returns the body of the response to a GET request for url.
+        """
+        async with self.session.get(self.relative(url), **self._request_kwargs()) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def close(self):
+        await self.session.close()
+
+    @property
+    def lists(self):
+        if not hasattr(self, '_lists'):
+            # The site stands in for the opener used by the synchronous
+            # classes.
+            self._lists = AsyncSharePointLists(self)
+        return self._lists
+
+    @property
+    def users(self):
+        if not hasattr(self, '_users'):
+            self._users = AsyncSharePointUsers(self, self.user_caches)
+        return self._users
+
+
+class AsyncSharePointLists(SharePointLists):
+    @property
+    def all_lists(self):
+        if not hasattr(self, '_all_lists'):
+            raise SharePointException("Lists haven't been fetched yet; await get() first")
+        return self._all_lists
+
+    async def get(self, key=None):
+        """
+        Fetches the lists in the site if they haven't been already.
+
+        Returns all the lists, or if a key is given, the list with that name
+        or ID.
+        """
+        if not hasattr(self, '_all_lists'):
+            collection, user_info = await asyncio.gather(
+                self.opener.post_soap(LIST_WEBSERVICE, SP.GetListCollection()),
+                # Explicitly request information about the UserInfo list.
+                # This can be accessed with the name "User Information List"
+                self.opener.post_soap(LIST_WEBSERVICE, SP.GetList(SP.listName("UserInfo"))))
+            all_lists = []
+            for list_element in collection.xpath('sp:GetListCollectionResult/sp:Lists/sp:List',
+                                                 namespaces=namespaces):
+                all_lists.append(AsyncSharePointList(self.opener, self, list_element))
+            list_element = user_info.xpath('.//sp:List', namespaces=namespaces)[0]
+            all_lists.append(AsyncSharePointList(self.opener, self, list_element))
+            self._all_lists = all_lists
+        if key is None:
+            return list(self._all_lists)
+        return self[key]
+
+    async def remove(self, list):
+        """
+        Removes a list from the site.
+        """
+        xml = SP.DeleteList(SP.listName(list.id))
+        await self.opener.post_soap(LIST_WEBSERVICE, xml,
+                                    soapaction='http://schemas.microsoft.com/sharepoint/soap/DeleteList')
+        self._list_removed(list)
+
+    async def create(self, name, description='', template=100):
+        """
+        Creates a new list in the site.
+        """
+        xml = self._add_list_xml(name, description, template)
+        result = await self.opener.post_soap(LIST_WEBSERVICE, xml,
+                                             soapaction='http://schemas.microsoft.com/sharepoint/soap/AddList')
+        self._list_added(AsyncSharePointList(self.opener, self, self._added_list_element(result)))
+
+
+class AsyncSharePointList(SharePointList):
+    @property
+    def settings(self):
+        if self._settings is None or not len(self._settings):
+            raise SharePointException("List settings haven't been fetched yet; await get_settings() first")
+        return self._settings
+
+    async def get_settings(self):
+        if self._settings is None or not len(self._settings):
+            xml = SP.GetList(SP.listName(self.id))
+            response = await self.opener.post_soap(LIST_WEBSERVICE, xml)
+            self._settings = response[0][0]
+        return self._settings
+
+    async def _get_list_items(self, field_group, folder='', page_size=5000, position=None, query=None,
+                              options=None):
+        xml = self._get_list_items_xml(field_group, folder, page_size, position, query, options)
+        response = await self.opener.post_soap(LIST_WEBSERVICE, xml)
+        return response[0][0][0]
+
+    async def iter_rows(self, folder='', page_size=5000, fields=None):
+        """
+        Yields the rows of the list, fetching them page_size at a time, and
+        only the named fields if fields is given.
+        """
+        await self.get_settings()
+        async for row in self._iter_rows(self._field_groups(fields), folder, page_size):
+            yield row
+
+    async def _iter_rows(self, field_groups, folder='', page_size=5000, query=None, options=None,
+                         make_row=None):
+        position = None
+        while True:
+            datas = await asyncio.gather(*(self._get_list_items(field_group, folder, page_size, position,
+                                                                query, options)
+                                           for field_group in field_groups))
+            for row in self._merge_rows(datas, make_row):
+                yield row
+            position = datas[0].get('ListItemCollectionPositionNext')
+            if not position:
+                break
+
+    async def get_rows(self, folder='', page_size=5000, fields=None):
+        """
+        Fetches and returns all the rows in the list, and caches them as rows.
+        """
+        self._set_rows([row async for row in self.iter_rows(folder, page_size, fields)])
+        return list(self._rows)
+
+    @property
+    def _row_base(self):
+        return AsyncSharePointListRow
+
+    async def delete(self):
+        """
+        Deletes the list from the site.
+        """
+        await self.lists.remove(self)
+
+    def projection(self, fields):
+        raise TypeError("AsyncSharePointList doesn't support projection(); use get_rows(fields=...)")
+
+    async def query(self, where=None, order_by=None, fields=None, limit=None, folder=''):
+        """
+        Returns the rows matching where, in the order given by order_by, with
+        SharePoint doing the filtering and sorting.
+
+        This behaves like SharePointList.query().
+        """
+        await self.get_settings()
+        query = caml.query_xml(self.fields, where, order_by)
+        page_size = 5000 if limit is None else min(limit, 5000)
+        rows = []
+        if limit == 0:
+            return rows
+        async for row in self._iter_rows(self._field_groups(fields), folder, page_size, query):
+            rows.append(row)
+            if len(rows) == limit:
+                break
+        return rows
+
+    @property
+    def rows(self):
+        if not hasattr(self, '_rows'):
+            raise SharePointException("Rows haven't been fetched yet; await get_rows() first")
+        return list(self._rows)
+
+    def _get_lookup_row(self, row_id, referring_list=None, field_name=None):
+        # Rows can't be fetched here, so they must have been already, by
+        # get_rows() or prefetch_lookups().
+        return self._rows_with_ids([row_id])[row_id]
+
+    async def get_by_ids(self, ids):
+        """
+        Returns a dict of the rows with the given IDs, leaving out any that
+        don't exist.
+
+        This behaves like SharePointList.get_by_ids().
+        """
+        ids = set(ids)
+        missing_ids = self._missing_ids(ids)
+        if missing_ids:
+            chunks = [missing_ids[i:i+500] for i in range(0, len(missing_ids), 500)]
+            self._add_fetched_rows(missing_ids, await asyncio.gather(*(self.query(where=caml.In('ID', chunk))
+                                                                       for chunk in chunks)))
+        return self._rows_with_ids(ids)
+
+    async def prefetch_lookups(self, rows=None, field_names=None):
+        """
+        Fetches the rows that the lookup fields of rows (by default, all the
+        rows in the list) refer to, so that those fields can be read.
+
+        This behaves like SharePointList.prefetch_lookups().
+        """
+        await asyncio.gather(*(lookup_list.get_by_ids(ids)
+                               for lookup_list, ids in self._lookup_ids(self.rows if rows is None else rows,
+                                                                        field_names)))
+
+    def _xml_parts(self, *args, **kwargs):
+        # Rows can't be fetched while the XML is built, so they must have been
+        # already.
+        self.rows
+        return super(AsyncSharePointList, self)._xml_parts(*args, **kwargs)
+
+    def _prefetching_lookups(self, rows, batch_size=500):
+        return rows
+
+    async def _get_list_item_changes(self, field_group, token=None, page_size=5000):
+        xml = self._get_list_item_changes_xml(field_group, token, page_size)
+        response = await self.opener.post_soap(
+            LIST_WEBSERVICE, xml,
+            soapaction='http://schemas.microsoft.com/sharepoint/soap/GetListItemChangesSinceToken')
+        return response[0][0]
+
+    async def sync(self, token=None, page_size=5000):
+        """
+        Fetches the rows that have changed since the last sync.
+
+        This behaves like SharePointList.sync(), returning a (changed_rows,
+        deleted_ids) pair.
+        """
+        await self.get_settings()
+        token = token or self.change_token
+        if token is None:
+            return await self._sync_all(page_size)
+        field_groups = self._field_groups()
+        attribs, change_types = collections.OrderedDict(), {}
+        while True:
+            listitems_by_group = await asyncio.gather(*(self._get_list_item_changes(field_group, token, page_size)
+                                                        for field_group in field_groups))
+            token, more_changes = self._read_changes(listitems_by_group, attribs, change_types)
+            if token is None:
+                # The token has expired, so start again from scratch
+                return await self._sync_all(page_size)
+            if not more_changes:
+                break
+        refetched = await self._get_attribs_by_ids(self._ids_to_refetch(attribs, change_types))
+        return self._apply_changes(token, attribs, change_types, refetched)
+
+    async def _sync_all(self, page_size=5000):
+        listitems = await self._get_list_item_changes(self._field_groups(['ID'])[0], page_size=1)
+        token = listitems.find('sp:Changes', namespaces=namespaces).attrib['LastChangeToken']
+        rows = [row async for row in self._iter_rows(self._field_groups(), page_size=page_size)]
+        self._set_rows(rows)
+        self.change_token = token
+        return list(rows), set()
+
+    async def _get_attribs_by_ids(self, ids):
+        ids = sorted(ids)
+        field_groups = self._field_groups()
+
+        async def get_attribs(chunk):
+            query = caml.query_xml(self.fields, caml.In('ID', chunk))
+            return [attrib async for attrib in self._iter_rows(field_groups, query=query, make_row=dict)]
+        chunks = [ids[i:i+500] for i in range(0, len(ids), 500)]
+        return list(itertools.chain.from_iterable(await asyncio.gather(*map(get_attribs, chunks))))
+
+    def download_attachments(self, *args, **kwargs):
+        raise TypeError("AsyncSharePointList doesn't support download_attachments(); use a SharePointList")
+
+    def mirror(self, *args, **kwargs):
+        raise TypeError("AsyncSharePointList doesn't support mirror(); use a SharePointList")
+
+    async def save(self, chunk_size=500, max_in_flight=10):
+        """
+        Updates the list with changes.
+
+        This behaves like SharePointList.save(), returning a SaveResult.
+        """
+        return await self._post_chunks(self._save_chunks(chunk_size), max_in_flight)
+
+    async def _post_chunks(self, chunks, max_in_flight=None):
+        import aiohttp
+        semaphore = asyncio.Semaphore(max_in_flight or 10)
+
+        async def post_chunk(chunk):
+            xml, rows_by_batch_id = chunk
+            async with semaphore:
+                try:
+                    response = await self.opener.post_soap(
+                        LIST_WEBSERVICE, xml,
+                        soapaction='http://schemas.microsoft.com/sharepoint/soap/UpdateListItems')
+                except (aiohttp.ClientError, asyncio.TimeoutError, etree.XMLSyntaxError) as e:
+                    return chunk, None, e
+            return chunk, response, None
+
+        save_result = SaveResult()
+        for future in asyncio.as_completed([post_chunk(chunk) for chunk in chunks]):
+            (xml, rows_by_batch_id), response, error = await future
+            if error is not None:
+                self._save_failed(xml, rows_by_batch_id, error, save_result)
+            else:
+                self._save_response(xml, response, rows_by_batch_id, save_result)
+        return save_result
+
+    @property
+    def moderation(self):
+        if self._meta['EnableModeration'] != 'True':
+            raise AttributeError('Moderation not enabled on this list')
+        elif not hasattr(self, '_moderation'):
+            self._moderation = AsyncModeration(self)
+        return self._moderation
+
+
+class AsyncSharePointListRow(SharePointListRow):
+    """
+    A row of an AsyncSharePointList. Documents and attachments can't be
+    fetched from it; use a SharePointList for those.
+    """
+    __slots__ = ()
+
+    def open(self):
+        raise TypeError("AsyncSharePointList rows don't support open(); use a SharePointList")
+
+    def download_to(self, *args, **kwargs):
+        raise TypeError("AsyncSharePointList rows don't support download_to(); use a SharePointList")
+
+    @property
+    def attachments(self):
+        raise TypeError("AsyncSharePointList rows don't support attachments; use a SharePointList")
+
+
+class AsyncModeration(Moderation):
+    """
+    Moderation for an AsyncSharePointList. The status views and
+    rows_by_status() are async generators, and set_status() is a coroutine.
+    """
+
+    async def rows_by_status(self, status, fields=None, page_size=5000):
+        await self._list.get_settings()
+        async for row in super(AsyncModeration, self).rows_by_status(status, fields, page_size):
+            yield row
+
+    async def set_status(self, rows, status, comment=None, chunk_size=500, max_in_flight=None):
+        """
+        Sets the moderation status of rows, with an optional comment. rows can
+        be an async iterable, such as one of the status views.
+
+        This behaves like Moderation.set_status(), returning a SaveResult.
+        """
+        if hasattr(rows, '__aiter__'):
+            rows = [row async for row in rows]
+        return await super(AsyncModeration, self).set_status(rows, status, comment, chunk_size, max_in_flight)
+
+
+class AsyncSharePointUsers(object):
+    def __init__(self, opener, caches=None):
+        self.opener = opener
+        self.caches = caches if caches is not None else UserCaches()
+        self._users = self.caches.users
+
+    async def get(self, key):
+        """
+        Returns the user with the given ID, raising KeyError if there isn't one.
+        """
+        import aiohttp
+        key = int(key)
+        user = self._users.get(key, missing)
+        if user is missing:
+            try:
+                data = await self.opener.open(USER_PATH.format(key))
+            except aiohttp.ClientResponseError as e:
+                if e.status != 404:
+                    raise
+                user = None
+            else:
+                props = etree.fromstring(data).xpath('.//m:properties/*',
+                                                     namespaces=namespaces)
+                user = SharePointUser(key, props)
+            self._users[key] = user
+        if user is None:
+            raise KeyError(key)
+        return user
@@ -2,6 +2,8 @@ import base64
 
 from six.moves.urllib.request import BaseHandler, HTTPPasswordMgrWithDefaultRealm, build_opener
 
+from .transport import KEEP_ALIVE_SUPPORTED, KeepAliveHandler
+
 
 class PreemptiveBasicAuthHandler(BaseHandler):
 
@@ -22,9 +24,21 @@ class PreemptiveBasicAuthHandler(BaseHandler):
     https_request = http_request
 
 
-def basic_auth_opener(url, username, password):
+def basic_auth_opener(url, username, password, transport=None):
+    """
+    Returns an opener that authenticates with HTTP basic auth.
+
+    transport is the handler used to make HTTP and HTTPS requests. By default
+    this is a KeepAliveHandler, which reuses connections between requests, or
+    on Python versions it doesn't support, urllib's own handlers.
+    """
     password_manager = HTTPPasswordMgrWithDefaultRealm()
     password_manager.add_password(None, url, username, password)
     auth_handler = PreemptiveBasicAuthHandler(password_manager)
-    opener = build_opener(auth_handler)
+    if transport is None and KEEP_ALIVE_SUPPORTED:
+        transport = KeepAliveHandler()
+    if transport is None:
+        opener = build_opener(auth_handler)
+    else:
+        opener = build_opener(auth_handler, transport)
     return opener
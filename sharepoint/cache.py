@@ -0,0 +1,100 @@
+"""
+A bounded, expiring in-memory cache, for things fetched from a site that are
+looked up again and again, such as users.
+"""
+
+import collections
+import threading
+import time
+
+# Returned by Cache.get() when asked to tell a missing entry from one whose
+# value is None
+missing = object()
+
+
+class Cache(object):
+    """
+    A thread-safe mapping holding at most max_size entries, which drops the
+    least recently used entry when it's full.
+
+    Entries expire ttl seconds after they're set. An entry whose value is
+    None records that something doesn't exist, and expires after
+    negative_ttl seconds instead (or ttl, if that's not given). None for
+    max_size or ttl means no limit.
+
+    Lookups and evictions are counted in hits, misses, evictions and
+    expirations; stats() returns them all.
+    """
+
+    def __init__(self, max_size=None, ttl=None, negative_ttl=None):
+        self.max_size, self.ttl = max_size, ttl
+        self.negative_ttl = negative_ttl if negative_ttl is not None else ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __repr__(self):
+        return '<Cache {0} entries, max_size={1}, ttl={2}>'.format(len(self), self.max_size, self.ttl)
+
+    def _entry(self, key):
+        # Call with the lock held
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        return entry
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entry(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            # Move it to the most recently used end (OrderedDict has no
+            # move_to_end() on Python 2)
+            self._entries[key] = self._entries.pop(key)
+            return entry[0]
+
+    def __getitem__(self, key):
+        value = self.get(key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        ttl = self.negative_ttl if value is None else self.ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, expires)
+            while self.max_size is not None and len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._entries[key]
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._entry(key) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def update(self, values):
+        for key, value in dict(values).items():
+            self[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'size': len(self),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations}
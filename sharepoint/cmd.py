@@ -1,5 +1,10 @@
+import os
+import re
+
 from .auth import basic_auth_opener
 from .site import SharePointSite
+from .utils import concurrent_map
+from .xml import XMLWriter
 
 
 class ExitCodes(object):
@@ -12,12 +17,56 @@ class ExitCodes(object):
     NO_SUCH_ACTION = 7
 
 
+def list_filenames(list_names):
+    """
+    Returns a filename for each list, made from its name. Names that would
+    otherwise give the same filename (ignoring case, as some filesystems do)
+    are numbered.
+    """
+    filenames, seen = [], set()
+    for list_name in list_names:
+        stem = re.sub(r'[^\w.-]+', '_', list_name)
+        filename, i = stem + '.xml', 1
+        while filename.lower() in seen:
+            i += 1
+            filename = '{0}_{1}.xml'.format(stem, i)
+        seen.add(filename.lower())
+        filenames.append(filename)
+    return filenames
+
+
+def export_lists(site, output_dir, pretty_print, xml_kwargs):
+    """
+    Writes each list to its own file in output_dir, fetching up to
+    xml_kwargs['jobs'] of them at once.
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    # Find the lists and their fields before fanning out, so that the
+    # workers don't all fetch the same things at once. Each list's fields
+    # are only fetched by one worker.
+    if xml_kwargs['list_names']:
+        lists = [site.lists[list_name] for list_name in xml_kwargs['list_names']]
+    else:
+        lists = list(site.lists)
+    concurrent_map(lambda l: l.fields, lists, xml_kwargs['jobs'])
+
+    def export_list(args):
+        l, filename = args
+        kwargs = dict(xml_kwargs, list_names=None, lists=[l], jobs=1)
+        with open(os.path.join(output_dir, filename), 'wb') as out:
+            site.write_xml(XMLWriter(out, pretty_print=pretty_print), **kwargs)
+
+    concurrent_map(export_list, list(zip(lists, list_filenames(l.name for l in lists))), xml_kwargs['jobs'])
+
+
 def main():
     from optparse import OptionParser, OptionGroup
+    import atexit
     import os
     import sys
     import warnings
-    from lxml import etree
 
     warnings.simplefilter("ignore")
 
@@ -32,7 +81,11 @@ def main():
     parser.add_option('-u', '--username', dest='username', help='Username')
     parser.add_option('-p', '--password', dest='password', help='Password')
     parser.add_option('-c', '--credentials', dest='credentials', help="File containing 'username:password'.")
+    parser.add_option('--cache-dir', dest='cache_dir',
+                      help="Directory in which to cache list settings between runs")
 
+    parser.add_option('--stats', dest='stats', action='store_true', default=False,
+                      help="Print a summary of the requests made to standard error when done")
     parser.add_option('-n', '--pretty-print', dest='pretty_print', action='store_true', default=True)
     parser.add_option('-N', '--no-pretty-print', dest='pretty_print', action='store_false')
 
@@ -62,6 +115,11 @@ def main():
                             help='List template name')
     list_options.add_option('--timeout', dest='timeout', default=None, type="float",
                             help='Connection timeout (in seconds)')
+    list_options.add_option('-j', '--jobs', dest='jobs', default=1, type="int",
+                            help='Number of lists to fetch at once (default 1)')
+    list_options.add_option('-o', '--output-dir', dest='output_dir', default=None,
+                            help='Directory in which to write a file for each list, instead of writing '
+                                 'them all to standard output (exportlists only)')
     parser.add_option_group(list_options)
 
     options, args = parser.parse_args()
@@ -82,26 +140,37 @@ def main():
         password = getpass()
 
     opener = basic_auth_opener(options.site_url, username, password)
-    site = SharePointSite(options.site_url, opener, timeout=options.timeout)
+    site = SharePointSite(options.site_url, opener, timeout=options.timeout,
+                          cache_dir=options.cache_dir and os.path.expanduser(options.cache_dir))
+    if options.stats:
+        # Actions may finish with sys.exit(), so print the summary at exit
+        atexit.register(lambda: sys.stderr.write(site.metrics.summary()))
 
     if not len(args) == 1:
         sys.stderr.write("You must provide an action. Use -h for more information.\n")
         sys.exit(ExitCodes.NO_SUCH_ACTION)
 
-    action, xml = args[0], None
+    # xml_kwargs are the arguments to site.write_xml() for actions that
+    # output XML.
+    action, xml_kwargs = args[0], None
 
     if action == 'lists':
-        xml = site.as_xml(include_lists=True,
+        xml_kwargs = dict(include_lists=True,
                           list_names=options.list_names or None,
                           include_list_data=False,
-                          include_field_definitions=False)
+                          include_field_definitions=False,
+                          jobs=options.jobs)
     elif action == 'exportlists':
-        xml = site.as_xml(include_lists=True,
+        xml_kwargs = dict(include_lists=True,
                           include_users=options.include_users,
                           list_names=options.list_names or None,
                           include_list_data=options.include_data,
                           include_field_definitions=options.include_field_definitions,
-                          transclude_xml=options.transclude_xml)
+                          transclude_xml=options.transclude_xml,
+                          jobs=options.jobs)
+        if options.output_dir:
+            export_lists(site, os.path.expanduser(options.output_dir), options.pretty_print, xml_kwargs)
+            sys.exit(0)
     elif action == 'deletelists':
         for list_name in options.list_names:
             try:
@@ -123,7 +192,7 @@ def main():
             if not options.list_names:
                 sys.stderr.write("You must specify a list. See -h for more information.\n")
                 sys.exit(ExitCodes.MISSING_ARGUMENT)
-        xml = site.as_xml(list_names=options.list_names or None,
+        xml_kwargs = dict(list_names=options.list_names or None,
                           include_field_definitions=options.include_field_definitions)
     elif action == 'shell':
         try:
@@ -140,8 +209,11 @@ def main():
         sys.stderr.write("Unsupported action: '%s'. Use -h to discover supported actions.\n")
         sys.exit(1)
 
-    if xml is not None:
-        sys.stdout.write(etree.tostring(xml, pretty_print=options.pretty_print))
+    if xml_kwargs is not None:
+        # Write the XML as it's generated, rather than building it all first.
+        out = getattr(sys.stdout, 'buffer', sys.stdout)
+        site.write_xml(XMLWriter(out, pretty_print=options.pretty_print), **xml_kwargs)
+        out.flush()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,214 @@
+"""
+Downloading files from a site to disk, a chunk at a time, and remembering
+what was downloaded so that unchanged files can be skipped next time.
+"""
+
+import errno
+import json
+import os
+import re
+import tempfile
+
+from six.moves import http_client
+from six.moves.urllib.error import HTTPError, URLError
+from six.moves.urllib.parse import quote, unquote, urlsplit, urlunsplit
+from six.moves.urllib.request import Request
+
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadResult(object):
+    """
+    The outcome of downloading a set of files.
+
+    downloaded and skipped hold the paths of the files that were downloaded
+    and of those that were already up to date. failed holds a (path, error)
+    pair for each file that couldn't be downloaded. A DownloadResult is true
+    if no files failed.
+    """
+
+    def __init__(self):
+        self.downloaded, self.skipped, self.failed = [], [], []
+
+    def __bool__(self):
+        return not self.failed
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return "<DownloadResult {0} downloaded, {1} skipped, {2} failed>".format(
+            len(self.downloaded), len(self.skipped), len(self.failed))
+
+
+class Manifest(object):
+    """
+    Records what is known about each file downloaded into a directory, such
+    as its ETag and size, in a JSON file there.
+
+    Files are identified by their paths relative to the directory, with '/'
+    as the separator.
+    """
+    filename = '.sharepoint-downloads.json'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, self.filename)
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            self.entries = {}
+
+    def local_path(self, relative_path):
+        return os.path.join(self.directory, *relative_path.split('/'))
+
+    def get(self, relative_path):
+        """
+        Returns what was recorded for a file, if the file is still there and
+        the size recorded for it, or None.
+        """
+        entry = self.entries.get(relative_path)
+        path = self.local_path(relative_path)
+        if entry and os.path.isfile(path) and os.path.getsize(path) == entry['size']:
+            return entry
+        return None
+
+    def put(self, relative_path, entry):
+        self.entries[relative_path] = entry
+
+    def save(self):
+        _makedirs(self.directory)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.rename(temp_path, self.path)
+
+
+def _makedirs(directory):
+    if not directory:
+        # A bare filename is in the current directory
+        return
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def quote_url(url):
+    """
+    Percent-encodes the path of url, which SharePoint doesn't always do.
+    """
+    scheme, netloc, path, query, fragment = urlsplit(url)
+    return urlunsplit((scheme, netloc, quote(unquote(path).encode('utf-8'), safe='/'), query, fragment))
+
+
+def safe_filename(filename):
+    """
+    Makes a name from a URL safe to use as a filename.
+    """
+    filename = filename.replace('/', '_').replace(os.sep, '_')
+    if filename in ('', '.', '..'):
+        filename = '_' + filename
+    return filename
+
+
+def url_filename(url):
+    """
+    Returns the last part of the path of url, made safe to use as a filename.
+    """
+    return safe_filename(unquote(urlsplit(url).path.rsplit('/', 1)[-1]))
+
+
+def _read_partial(part_path):
+    """
+    Returns the size of an interrupted download, and the validator to resume
+    it with, or None if it can't be resumed.
+    """
+    try:
+        with open(part_path + '.json') as f:
+            validator = json.load(f)['validator']
+        size = os.path.getsize(part_path)
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+    if not size or not validator:
+        return None
+    return size, validator
+
+
+def _range_start(response):
+    match = re.match(r'bytes (\d+)-', response.headers.get('Content-Range') or '')
+    return int(match.group(1)) if match else None
+
+
+def download(opener, url, path, chunk_size=CHUNK_SIZE, validators=None, headers=None):
+    """
+    Streams the file at url to path, a chunk at a time.
+
+    The file is written to path + '.part' and renamed once complete. If a
+    download is interrupted, the next one carries on from where it stopped
+    with a Range request, as long as the file hasn't changed in between.
+
+    validators is what an earlier call returned for the file; if given, the
+    file is only fetched if it has changed since. Returns a dict of the
+    file's etag, last_modified and size, or None if it hadn't changed.
+    """
+    part_path = path + '.part'
+    partial = _read_partial(part_path)
+    request = Request(quote_url(url))
+    request.operation = 'download'
+    for name, value in (headers or {}).items():
+        request.add_header(name, value)
+    if validators and validators.get('etag'):
+        request.add_header('If-None-Match', validators['etag'])
+    if validators and validators.get('last_modified'):
+        request.add_header('If-Modified-Since', validators['last_modified'])
+    if partial:
+        request.add_header('Range', 'bytes={0}-'.format(partial[0]))
+        request.add_header('If-Range', partial[1])
+    try:
+        response = opener.open(request)
+    except HTTPError as e:
+        e.close()
+        if e.code == 304:
+            return None
+        if e.code == 416 and partial:
+            # What we have is no good, so start again
+            os.remove(part_path)
+            return download(opener, url, path, chunk_size, validators, headers)
+        raise
+
+    try:
+        info = {'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')}
+        if response.getcode() == 206:
+            if not partial or _range_start(response) != partial[0]:
+                raise URLError("Unexpected range in response: {0}".format(response.headers.get('Content-Range')))
+            mode, size = 'ab', partial[0]
+        else:
+            mode, size = 'wb', 0
+        _makedirs(os.path.dirname(path))
+        # Weak ETags can't be used to resume
+        validator = info['last_modified'] if (info['etag'] or 'W/').startswith('W/') else info['etag']
+        with open(part_path + '.json', 'w') as f:
+            json.dump({'validator': validator}, f)
+        expected_size = response.headers.get('Content-Length')
+        expected_size = int(expected_size) + size if expected_size else None
+
+        with open(part_path, mode) as f:
+            while True:
+                try:
+                    chunk = response.read(chunk_size)
+                except http_client.HTTPException as e:
+                    raise URLError(e)
+                if not chunk:
+                    break
+                f.write(chunk)
+                size += len(chunk)
+        if expected_size is not None and size != expected_size:
+            raise URLError("Download of {0} stopped at {1} of {2} bytes".format(url, size, expected_size))
+        os.rename(part_path, path)
+        os.remove(part_path + '.json')
+    finally:
+        response.close()
+    info['size'] = size
+    return info
@@ -1,27 +1,38 @@
 import collections
+import datetime
+import functools
+import itertools
 import re
 
 from six import text_type
-from six.moves.urllib.parse import quote
+from six.moves import http_client, zip_longest
+from six.moves.urllib.parse import quote, urljoin
 from six.moves.urllib.request import Request
-from six.moves.urllib.error import HTTPError
+from six.moves.urllib.error import HTTPError, URLError
 
 from lxml import etree
 from lxml.builder import E
 
 from sharepoint.xml import SP, namespaces, OUT
-from sharepoint.lists import moderation
+from sharepoint.lists import caml, moderation
 from sharepoint.lists.types import type_mapping, default_type, UserField, LookupField
 from sharepoint.lists.attachments import SharePointAttachments
+from sharepoint.lists.index import RowIndex
 from sharepoint.lists.definitions import LIST_WEBSERVICE, LIST_TEMPLATES
-from sharepoint.exceptions import UpdateFailedError
+from sharepoint.exceptions import SharePointException, UpdateFailedError
+from sharepoint.downloads import CHUNK_SIZE, DownloadResult, Manifest, download, safe_filename, url_filename
+from sharepoint.utils import concurrent_map, concurrent_imap, concurrent_imap_unordered
+
+# Changes after which a row is no longer in the list
+REMOVING_CHANGES = ('Delete', 'MoveAway')
 
 uuid_re = re.compile(r'^\{?([\da-f]{8}-[\da-f]{4}-[\da-f]{4}-[\da-f]{4}-[\da-f]{12})\}?$')
 
 
 class SharePointLists(object):
-    def __init__(self, opener):
+    def __init__(self, opener, settings_cache=None):
         self.opener = opener
+        self.settings_cache = settings_cache
 
     @property
     def all_lists(self):
@@ -31,6 +42,11 @@ class SharePointLists(object):
     
             self._all_lists = []
             for list_element in result.xpath('sp:GetListCollectionResult/sp:Lists/sp:List', namespaces=namespaces):
+                # Use the full settings from the cache if they're up to date
+                if self.settings_cache is not None:
+                    cached_settings = self.settings_cache.get(self.opener.base_url, list_element)
+                    if cached_settings is not None:
+                        list_element = cached_settings
                 self._all_lists.append(SharePointList(self.opener, self, list_element))
             
             # Explicitly request information about the UserInfo list.
@@ -48,12 +64,22 @@ class SharePointLists(object):
         xml = SP.DeleteList(SP.listName(list.id))
         self.opener.post_soap(LIST_WEBSERVICE, xml,
                               soapaction='http://schemas.microsoft.com/sharepoint/soap/DeleteList')
+        self._list_removed(list)
+
+    def _list_removed(self, list):
         self.all_lists.remove(list)
+        self.lists_by_id.pop(list.id, None)
 
     def create(self, name, description='', template=100):
         """
         Creates a new list in the site.
         """
+        xml = self._add_list_xml(name, description, template)
+        result = self.opener.post_soap(LIST_WEBSERVICE, xml,
+                                       soapaction='http://schemas.microsoft.com/sharepoint/soap/AddList')
+        self._list_added(SharePointList(self.opener, self, self._added_list_element(result)))
+
+    def _add_list_xml(self, name, description, template):
         try:
             template = int(template)
         except ValueError:
@@ -62,17 +88,27 @@ class SharePointLists(object):
             raise ValueError("List already exists: '{0}".format(name))
         if uuid_re.match(name):
             raise ValueError("Cannot create a list with a UUID as a name")
-        xml = SP.AddList(SP.listName(name),
-                         SP.description(description),
-                         SP.templateID(text_type(template)))
-        result = self.opener.post_soap(LIST_WEBSERVICE, xml,
-                                       soapaction='http://schemas.microsoft.com/sharepoint/soap/AddList')
-        list_element = result.xpath('sp:AddListResult/sp:List', namespaces=namespaces)[0]
-        self._all_lists.append(SharePointList(self.opener, self, list_element))
+        return SP.AddList(SP.listName(name),
+                          SP.description(description),
+                          SP.templateID(text_type(template)))
+
+    def _added_list_element(self, result):
+        return result.xpath('sp:AddListResult/sp:List', namespaces=namespaces)[0]
+
+    def _list_added(self, list_object):
+        self.all_lists.append(list_object)
+        self.lists_by_id[list_object.id] = list_object
 
     def __iter__(self):
         return iter(self.all_lists)
 
+    @property
+    def lists_by_id(self):
+        if not hasattr(self, '_lists_by_id'):
+            self._lists_by_id = dict((list_object.id, list_object)
+                                     for list_object in self.all_lists)
+        return self._lists_by_id
+
     def __getitem__(self, key):
         if isinstance(key, int):
             return self.all_lists[key]
@@ -80,10 +116,10 @@ class SharePointLists(object):
             # Using group 1 and adding braces allows us to match IDs that
             # didn't originally have braces.
             key = '{' + '{0}'.format(uuid_re.match(key.lower()).group(1)) + '}'
-            for list_object in self.all_lists:
-                if list_object.id == key:
-                    return list_object
-            raise KeyError('No list with ID {0}'.format(key))
+            try:
+                return self.lists_by_id[key]
+            except KeyError:
+                raise KeyError('No list with ID {0}'.format(key))
         elif isinstance(key, str):
             for list_object in self.all_lists:
                 if list_object.meta['Title'] == key:
@@ -106,13 +142,66 @@ class SharePointLists(object):
             lists = self
         return OUT.lists(*[l.as_xml(**kwargs) for l in lists])
 
+    def write_xml(self, writer, list_names=None, jobs=1, referenced_users=None, lists=None, **kwargs):
+        """
+        Like as_xml(), but writes to an XMLWriter, a row at a time. lists, if
+        given, are the SharePointList objects to write, in place of
+        list_names.
+
+        With jobs greater than one, that many lists are fetched at once. The
+        lists are still written in order, so each is held in memory until
+        those before it have been written, but no more than jobs lists are
+        fetched ahead of the one being written.
+        """
+        if lists is not None:
+            lists = list(lists)
+        elif list_names is not None:
+            lists = [self[list_name] for list_name in list_names]
+        else:
+            lists = list(self)
+        with writer.element(OUT.lists()):
+            if jobs > 1:
+                def prepare(l):
+                    fields_element, row_elements = l._xml_parts(**kwargs)
+                    if row_elements is not None:
+                        row_elements = list(row_elements)
+                    return l, fields_element, row_elements
+                for l, fields_element, row_elements in concurrent_imap(prepare, lists, jobs):
+                    l._write_xml_parts(writer, fields_element, row_elements, referenced_users)
+            else:
+                for l in lists:
+                    l.write_xml(writer, referenced_users=referenced_users, **kwargs)
+
+
+class SaveResult(object):
+    """
+    The outcome of saving a list.
+
+    saved holds the rows that were saved, and failed an UpdateFailedError for
+    each row that wasn't. A SaveResult is true if every row was saved.
+    """
+
+    def __init__(self):
+        self.saved, self.failed = [], []
+
+    def __bool__(self):
+        return not self.failed
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return "<SaveResult {0} saved, {1} failed>".format(len(self.saved), len(self.failed))
+
 
 class SharePointList(object):
     def __init__(self, opener, lists, settings):
         self.opener = opener
         self.lists = lists
         self._deleted_rows = set()
+        self._indexes = {}
+        # Rows fetched by get_by_ids(), with None for IDs that weren't found
+        self._rows_fetched_by_id = {}
         self._settings, self._meta = settings, None
+        self.change_token = None
         self.id = self.meta['ID'].lower()
 
     def __repr__(self):
@@ -135,6 +224,8 @@ class SharePointList(object):
             xml = SP.GetList(SP.listName(self.id))
             response = self.opener.post_soap(LIST_WEBSERVICE, xml)
             self._settings = response[0][0]
+            if self.lists.settings_cache is not None:
+                self.lists.settings_cache.put(self.opener.base_url, self._settings)
         return self._settings
     
     @property
@@ -145,33 +236,274 @@ class SharePointList(object):
             self._moderation = moderation.Moderation(self)
         return self._moderation
 
-    def get_rows(self, folder=''):
-        rows = []
-        attribs = collections.defaultdict(dict)
+    def _field_groups(self, field_names=None):
+        """
+        Splits the fields (or just those named) into groups with fewer than
+        eight lookup fields each, so that each request stays under the lookup
+        threshold.
+        """
+        if field_names is None:
+            fields = self.fields.values()
+        else:
+            # The ID is needed to put rows together again
+            fields = [self.fields[name] for name in field_names]
+            if 'ID' in self.fields and 'ID' not in field_names:
+                fields.insert(0, self.fields['ID'])
         field_groups, lookup_count = [[]], 0
-        for field in self.fields.values():
+        for field in fields:
             if isinstance(field, (UserField, LookupField)):
                 lookup_count += 1
             if lookup_count >= 8:
                 lookup_count = 0
                 field_groups.append([])
             field_groups[-1].append(field)
-        for field_group in field_groups:
-            # Request all fields, not just the ones in the default view
-            view_fields = E.ViewFields(*(E.FieldRef(Name=field.name) for field in field_group))
-            #query_options = E.QueryOptions(E.ViewAttributes(Scope="Recursive"))
-            query_options = E.QueryOptions(E.Folder(folder))
-            xml = SP.GetListItems(SP.listName(self.id),
-                                  SP.rowLimit("100000"),
-                                  SP.viewFields(view_fields),
-                                  SP.queryOptions(query_options))
-            response = self.opener.post_soap(LIST_WEBSERVICE, xml)
-            for row in list(response[0][0][0]):
-                attrib = attribs[row.attrib['ows_ID']]
-                attrib.update(row.attrib)
+        return field_groups
+
+    def _get_list_items_xml(self, field_group, folder='', page_size=5000, position=None, query=None,
+                            options=None):
+        # Request all fields, not just the ones in the default view
+        view_fields = E.ViewFields(*(E.FieldRef(Name=field.name) for field in field_group))
+        #query_options = E.QueryOptions(E.ViewAttributes(Scope="Recursive"))
+        query_options = E.QueryOptions(E.Folder(folder))
+        for name, value in sorted((options or {}).items()):
+            # Values are either the element's text, or a dict of its attributes
+            if isinstance(value, dict):
+                query_options.append(getattr(E, name)(**value))
+            else:
+                query_options.append(getattr(E, name)(value))
+        if position:
+            query_options.append(E.Paging(ListItemCollectionPositionNext=position))
+        xml = SP.GetListItems(SP.listName(self.id),
+                              SP.rowLimit(text_type(page_size)),
+                              SP.viewFields(view_fields),
+                              SP.queryOptions(query_options))
+        if query is not None:
+            xml.insert(1, SP.query(query))
+        return xml
+
+    def _get_list_items(self, field_group, folder='', page_size=5000, position=None, query=None,
+                        options=None):
+        xml = self._get_list_items_xml(field_group, folder, page_size, position, query, options)
+        return self.opener.post_soap(LIST_WEBSERVICE, xml, stream=True)
+
+    def _merge_rows(self, datas, make_row=None):
+        """
+        Yields rows built from the z:row elements returned for each field
+        group, each as soon as it has been seen in every group.
+
+        The groups return their rows in the same order, so when they're
+        streamed, only a row or so from each is held at once. Rows are made
+        by calling make_row with their attributes, which by default makes a
+        Row.
+        """
+        if make_row is None:
+            make_row = lambda attrib: self.Row(attrib=attrib)
+        pending, counts = collections.OrderedDict(), {}
+        for group_rows in zip_longest(*datas):
+            for row in group_rows:
+                if row is None:
+                    continue
+                row_id = row.attrib['ows_ID']
+                pending.setdefault(row_id, {}).update(row.attrib)
+                counts[row_id] = counts.get(row_id, 0) + 1
+                if counts[row_id] == len(datas):
+                    del counts[row_id]
+                    yield make_row(pending.pop(row_id))
+        # Rows that were missing from some groups
+        for attrib in pending.values():
+            yield make_row(attrib)
+
+    def iter_rows(self, folder='', page_size=5000, fields=None):
+        """
+        Yields the rows of the list, fetching them page_size at a time.
+
+        Rows are decoded as they are parsed from the response, and each page
+        is finished before the next is requested, so only a few rows are held
+        in memory at once.
+
+        If fields is given, only the named fields are fetched, and the others
+        read as if they were empty: None, or '' for text fields and [] for
+        multi-valued fields.
+        """
+        return self._iter_rows(self._field_groups(fields), folder, page_size)
+
+    def _iter_rows(self, field_groups, folder='', page_size=5000, query=None, options=None, make_row=None):
+        position = None
+        while True:
+            # The requests for each field group are made concurrently. Every
+            # group is asked for the same page, so the position of the first
+            # is good for all of them.
+            get_list_items = functools.partial(self._get_list_items, folder=folder,
+                                               page_size=page_size, position=position,
+                                               query=query, options=options)
+            streams = concurrent_map(get_list_items, field_groups, self.opener.max_workers)
+            for row in self._merge_rows(streams, make_row):
+                yield row
+            position = streams[0].data_attrib.get('ListItemCollectionPositionNext')
+            if not position:
+                break
+
+    def get_rows(self, folder='', page_size=5000, fields=None):
+        return list(self.iter_rows(folder, page_size, fields))
+
+    def projection(self, fields):
+        """
+        Returns a view of the list's rows with only the named fields fetched.
+        """
+        return SharePointListProjection(self, fields)
+
+    def query(self, where=None, order_by=None, fields=None, limit=None, folder=''):
+        """
+        Returns the rows matching where, in the order given by order_by, with
+        SharePoint doing the filtering and sorting.
+
+        where is a condition built with sharepoint.lists.caml (or a CAML
+        element), and order_by a list of field names, each prefixed with '-'
+        to sort in descending order. If fields is given, only the named
+        fields are fetched, and the others read as if they were empty (see
+        iter_rows()). At most limit rows are returned.
+
+        The rows returned aren't added to rows.
+        """
+        query = caml.query_xml(self.fields, where, order_by)
+        page_size = 5000 if limit is None else min(limit, 5000)
+        rows = self._iter_rows(self._field_groups(fields), folder, page_size, query)
+        return list(itertools.islice(rows, limit))
+
+    def _get_list_item_changes_xml(self, field_group, token=None, page_size=5000):
+        view_fields = E.ViewFields(*(E.FieldRef(Name=field.name) for field in field_group))
+        xml = SP.GetListItemChangesSinceToken(SP.listName(self.id),
+                                              SP.viewFields(view_fields),
+                                              SP.rowLimit(text_type(page_size)))
+        if token:
+            xml.append(SP.changeToken(token))
+        return xml
+
+    def _get_list_item_changes(self, field_group, token=None, page_size=5000):
+        xml = self._get_list_item_changes_xml(field_group, token, page_size)
+        response = self.opener.post_soap(LIST_WEBSERVICE, xml,
+                                         soapaction='http://schemas.microsoft.com/sharepoint/soap/GetListItemChangesSinceToken')
+        return response[0][0]
+
+    def sync(self, token=None, page_size=5000):
+        """
+        Fetches the rows that have changed since the last sync.
+
+        Implements http://msdn.microsoft.com/en-us/library/lists.lists.getlistitemchangessincetoken.aspx
+
+        Changes are requested since token, or since self.change_token if no
+        token is given. With neither, or if the token has expired, every row
+        is fetched, page_size at a time. Added and updated rows replace those
+        cached in rows and rows_by_id, and deleted rows (and those moved out
+        of the list) are dropped from them; any unsaved changes to those rows
+        are lost. Afterwards, self.change_token holds the token to store and
+        pass to a later sync() to resume from this point.
+
+        Returns a (changed_rows, deleted_ids) pair.
+        """
+        token = token or self.change_token
+        if token is None:
+            return self._sync_all(page_size)
+        field_groups = self._field_groups()
+        attribs, change_types = collections.OrderedDict(), {}
+        while True:
+            get_list_item_changes = functools.partial(self._get_list_item_changes,
+                                                      token=token, page_size=page_size)
+            listitems_by_group = concurrent_map(get_list_item_changes, field_groups, self.opener.max_workers)
+            token, more_changes = self._read_changes(listitems_by_group, attribs, change_types)
+            if token is None:
+                # The token has expired, so start again from scratch
+                return self._sync_all(page_size)
+            if not more_changes:
+                break
+        refetched = self._get_attribs_by_ids(self._ids_to_refetch(attribs, change_types))
+        return self._apply_changes(token, attribs, change_types, refetched)
+
+    def _sync_all(self, page_size=5000):
+        # The token is taken before the rows are fetched, so that changes
+        # made in between are picked up by the next sync.
+        listitems = self._get_list_item_changes(self._field_groups(['ID'])[0], page_size=1)
+        token = listitems.find('sp:Changes', namespaces=namespaces).attrib['LastChangeToken']
+        rows = list(self._iter_rows(self._field_groups(), page_size=page_size))
+        self._set_rows(rows)
+        self.change_token = token
+        return list(rows), set()
+
+    def _read_changes(self, listitems_by_group, attribs, change_types):
+        """
+        Adds the rows in a page of changes to attribs, and the types of the
+        changes listed to change_types, by row ID. Returns the token for the
+        next page and whether there are more changes, or (None, False) if
+        the token has expired.
+        """
+        changes = listitems_by_group[0].find('sp:Changes', namespaces=namespaces)
+        for id_element in changes.iterfind('sp:Id', namespaces=namespaces):
+            change_type = id_element.get('ChangeType')
+            if change_type == 'InvalidToken':
+                return None, False
+            if id_element.text and id_element.text.strip().isdigit():
+                change_types[int(id_element.text)] = change_type
+        for listitems in listitems_by_group:
+            for row in listitems.find('rs:data', namespaces=namespaces):
+                attribs.setdefault(row.attrib['ows_ID'], {}).update(row.attrib)
+        return changes.attrib['LastChangeToken'], changes.get('MoreChanges') == 'TRUE'
+
+    def _ids_to_refetch(self, attribs, change_types):
+        """
+        Returns the IDs of rows that changed in a way that didn't come with
+        their new values (such as being restored or renamed).
+        """
+        return set(row_id for row_id, change_type in change_types.items()
+                   if change_type not in REMOVING_CHANGES and text_type(row_id) not in attribs)
+
+    def _get_attribs_by_ids(self, ids):
+        """
+        Returns the raw attributes of the rows with the given IDs that still
+        exist, fetched with a query for each 500 of them.
+        """
+        ids = sorted(ids)
+        field_groups = self._field_groups()
+
+        def get_attribs(chunk):
+            query = caml.query_xml(self.fields, caml.In('ID', chunk))
+            return list(self._iter_rows(field_groups, query=query, make_row=dict))
+        chunks = [ids[i:i+500] for i in range(0, len(ids), 500)]
+        return list(itertools.chain.from_iterable(concurrent_map(get_attribs, chunks, self.opener.max_workers)))
+
+    def _apply_changes(self, token, attribs, change_types, refetched):
+        """
+        Updates the rows from the changes read by sync(), and refetched, the
+        attributes of rows to be refetched, returning what sync() returns.
+        """
+        deleted_ids = set(row_id for row_id, change_type in change_types.items()
+                          if change_type in REMOVING_CHANGES)
+        # Rows that couldn't be refetched are gone
+        deleted_ids.update(self._ids_to_refetch(attribs, change_types))
+        for attrib in refetched:
+            attribs[attrib['ows_ID']] = attrib
+
+        changed_rows = []
         for attrib in attribs.values():
-            rows.append(self.Row(attrib=attrib))
-        return list(rows)
+            row_id = int(attrib['ows_ID'])
+            deleted_ids.discard(row_id)
+            if hasattr(self, '_rows') and row_id in self.rows_by_id:
+                row = self.rows_by_id[row_id]
+                row._update(None, attrib, clear=True)
+                self._reindex(row)
+            else:
+                row = self.Row(attrib=attrib)
+                if hasattr(self, '_rows'):
+                    self._add_row(row)
+            changed_rows.append(row)
+
+        if hasattr(self, '_rows'):
+            for row_id in deleted_ids:
+                row = self.rows_by_id.get(row_id)
+                if row is not None:
+                    self._remove_row(row)
+
+        self.change_token = token
+        return changed_rows, deleted_ids
 
     @property
     def rows(self):
@@ -184,9 +516,159 @@ class SharePointList(object):
         if not hasattr(self, '_rows_by_id'):
             self._rows_by_id = {}
             for row in self.rows:
-                self._rows_by_id[row.id] = row
+                # New rows get their IDs when they're saved
+                if row.id is not None:
+                    self._rows_by_id[row.id] = row
         return self._rows_by_id
 
+    def get_by_ids(self, ids):
+        """
+        Returns a dict of the rows with the given IDs, leaving out any that
+        don't exist.
+
+        If rows haven't been fetched, only the rows asked for are fetched,
+        with a query for each 500 of them, and they're kept for later calls.
+        """
+        ids = set(ids)
+        missing_ids = self._missing_ids(ids)
+        if missing_ids:
+            query = lambda chunk: self.query(where=caml.In('ID', chunk))
+            chunks = [missing_ids[i:i+500] for i in range(0, len(missing_ids), 500)]
+            self._add_fetched_rows(missing_ids, concurrent_map(query, chunks, self.opener.max_workers))
+        return self._rows_with_ids(ids)
+
+    def _missing_ids(self, ids):
+        """
+        Returns, sorted, those of ids that get_by_ids() would need to fetch.
+        """
+        if hasattr(self, '_rows'):
+            return []
+        return sorted(ids.difference(self._rows_fetched_by_id))
+
+    def _add_fetched_rows(self, ids, row_lists):
+        for rows in row_lists:
+            for row in rows:
+                self._rows_fetched_by_id[row.id] = row
+        for row_id in ids:
+            self._rows_fetched_by_id.setdefault(row_id, None)
+
+    def _rows_with_ids(self, ids):
+        if hasattr(self, '_rows'):
+            rows_by_id = self.rows_by_id
+            return dict((row_id, rows_by_id[row_id]) for row_id in ids if row_id in rows_by_id)
+        return dict((row_id, self._rows_fetched_by_id[row_id]) for row_id in ids
+                    if self._rows_fetched_by_id.get(row_id) is not None)
+
+    def _get_lookup_row(self, row_id, referring_list=None, field_name=None):
+        """
+        Returns the row a lookup field refers to, raising KeyError if there
+        isn't one.
+
+        If the row hasn't been fetched, the rows that field_name refers to
+        from all the rows of referring_list that have been fetched are
+        fetched with it, so that reading the field from each of them doesn't
+        make a request.
+        """
+        if referring_list is not None and self._missing_ids({row_id}):
+            referring_rows = getattr(referring_list, '_rows', None)
+            if referring_rows:
+                referring_list.prefetch_lookups(referring_rows, [field_name])
+        return self.get_by_ids([row_id])[row_id]
+
+    def prefetch_lookups(self, rows=None, field_names=None):
+        """
+        Fetches the rows that the lookup fields of rows (by default, all the
+        rows in the list) refer to, so that reading those fields doesn't make
+        a request for each row.
+
+        The IDs referred to are collected from all the rows first, and then
+        fetched from each list they're in with get_by_ids().
+        """
+        for lookup_list, ids in self._lookup_ids(self.rows if rows is None else rows, field_names):
+            lookup_list.get_by_ids(ids)
+
+    def _lookup_ids(self, rows, field_names=None):
+        """
+        Returns (list, IDs) pairs of the rows that the lookup fields of rows
+        (or just those named) refer to in each list.
+        """
+        lookup_fields = [field for field in self.fields.values()
+                         if isinstance(field, LookupField) and
+                         (field_names is None or field.name in field_names)]
+        ids_by_list = collections.defaultdict(set)
+        for row in rows:
+            for field in lookup_fields:
+                try:
+                    value = row._get(field.name)
+                except KeyError:
+                    continue
+                for value in (value if field.multi else [value]):
+                    ids_by_list[value['list']].add(value['id'])
+        lookup_ids = []
+        for list_id, ids in ids_by_list.items():
+            try:
+                lookup_ids.append((self.lists[list_id], ids))
+            except KeyError:
+                continue
+        return lookup_ids
+
+    def _prefetching_lookups(self, rows, batch_size=500):
+        """
+        Yields rows, prefetching their lookups batch_size rows at a time.
+        """
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            self.prefetch_lookups(batch)
+            for row in batch:
+                yield row
+
+    def index_by(self, *field_names):
+        """
+        Returns a RowIndex of the list's rows by the named fields.
+
+        The index is kept up to date as rows are appended, removed, changed
+        and saved, and later calls with the same names return the same index.
+        """
+        for name in field_names:
+            if name not in self.fields:
+                raise KeyError(name)
+        if field_names not in self._indexes:
+            self._indexes[field_names] = RowIndex(field_names, self.rows)
+        return self._indexes[field_names]
+
+    def _set_rows(self, rows):
+        self._rows = rows
+        if hasattr(self, '_rows_by_id'):
+            del self._rows_by_id
+        for index in self._indexes.values():
+            index.rebuild(rows)
+
+    def _add_row(self, row):
+        self._rows.append(row)
+        if hasattr(self, '_rows_by_id') and row.id is not None:
+            self._rows_by_id[row.id] = row
+        for index in self._indexes.values():
+            index.add(row)
+
+    def _remove_row(self, row):
+        self._rows.remove(row)
+        if hasattr(self, '_rows_by_id') and self._rows_by_id.get(row.id) is row:
+            del self._rows_by_id[row.id]
+        for index in self._indexes.values():
+            index.discard(row)
+
+    def _reindex(self, row, field_name=None):
+        """
+        Updates the indexes after a change to row, or just those on
+        field_name if given.
+        """
+        for field_names, index in self._indexes.items():
+            if field_name is None or field_name in field_names:
+                index.update(row)
+
     @property
     def fields(self):
         if not hasattr(self, '_fields'):
@@ -203,37 +685,85 @@ class SharePointList(object):
         The class for a row in this list.
         """
         if not hasattr(self, '_row_class'):
-            attrs = {'fields': self.fields, 'list': self, 'opener': self.opener}
+            field_list = list(self.fields.values())
+            attrs = {'fields': self.fields, 'list': self, 'opener': self.opener,
+                     '__slots__': (),
+                     '_field_list': field_list,
+                     '_field_index': dict((field.name, i) for i, field in enumerate(field_list)),
+                     '_attrib_keys': ['ows_' + field.name for field in field_list],
+                     '_parsers': [field.value_parser() for field in field_list]}
             for field in self.fields.values():
                 attrs[field.name] = field.descriptor
-            self._row_class = type('SharePointListRow', (SharePointListRow,), attrs)
+            self._row_class = type('SharePointListRow', (self._row_base,), attrs)
         return self._row_class
 
-    def as_xml(self, include_list_data=True, include_field_definitions=True, **kwargs):
-        list_element = OUT('list', name=self.name, id=self.id)
+    @property
+    def _row_base(self):
+        # The class that Row subclasses
+        return SharePointListRow
 
-        if include_field_definitions:
-            fields_element = OUT('fields')
-            for field in self.fields.values():
-                field_element = OUT('field',
-                                    name=field.name,
-                                    display_name=field.display_name,
-                                    sharepoint_type=field.sharepoint_type,
-                                    type=field.type_name,
-                                    **field.extra_field_definition())
-                if field.description:
-                    field_element.attrib['description'] = field.description
-                field_element.attrib['multi'] = 'true' if field.multi else 'false'
-                fields_element.append(field_element)
-            list_element.append(fields_element)
+    def _fields_as_xml(self):
+        fields_element = OUT('fields')
+        for field in self.fields.values():
+            field_element = OUT('field',
+                                name=field.name,
+                                display_name=field.display_name,
+                                sharepoint_type=field.sharepoint_type,
+                                type=field.type_name,
+                                **field.extra_field_definition())
+            if field.description:
+                field_element.attrib['description'] = field.description
+            field_element.attrib['multi'] = 'true' if field.multi else 'false'
+            fields_element.append(field_element)
+        return fields_element
 
+    def _xml_parts(self, include_list_data=True, include_field_definitions=True, **kwargs):
+        """
+        Returns the field definitions element and an iterator over row
+        elements, each None if they're not to be included.
+        """
+        fields_element = self._fields_as_xml() if include_field_definitions else None
+        row_elements = None
         if include_list_data:
-            rows_element = OUT('rows')
-            for row in self.rows:
-                rows_element.append(row.as_xml(**kwargs))
-            list_element.append(rows_element)
+            # Don't hold on to all the rows if they're not already loaded
+            rows = self._rows if hasattr(self, '_rows') else self.iter_rows()
+            if kwargs.get('follow_lookups'):
+                rows = self._prefetching_lookups(rows)
+            row_elements = (row.as_xml(**kwargs) for row in rows)
+        return fields_element, row_elements
+
+    def as_xml(self, include_list_data=True, include_field_definitions=True, **kwargs):
+        list_element = OUT('list', name=self.name, id=self.id)
+        fields_element, row_elements = self._xml_parts(include_list_data, include_field_definitions, **kwargs)
+        if fields_element is not None:
+            list_element.append(fields_element)
+        if row_elements is not None:
+            list_element.append(OUT('rows', *row_elements))
         return list_element
 
+    def write_xml(self, writer, include_list_data=True, include_field_definitions=True,
+                  referenced_users=None, **kwargs):
+        """
+        Like as_xml(), but writes to an XMLWriter, a row at a time.
+
+        If referenced_users is a set, the IDs of users referenced by rows are
+        added to it.
+        """
+        fields_element, row_elements = self._xml_parts(include_list_data, include_field_definitions, **kwargs)
+        self._write_xml_parts(writer, fields_element, row_elements, referenced_users)
+
+    def _write_xml_parts(self, writer, fields_element, row_elements, referenced_users=None):
+        with writer.element(OUT('list', name=self.name, id=self.id)):
+            if fields_element is not None:
+                writer.write(fields_element)
+            if row_elements is not None:
+                with writer.element(OUT('rows')):
+                    for row_element in row_elements:
+                        if referenced_users is not None:
+                            referenced_users.update(row_element.xpath('.//sharepoint:user/@id',
+                                                                      namespaces=namespaces))
+                        writer.write(row_element)
+
     def append(self, row):
         """
         Appends a row to the list. Takes a dictionary, returns a row.
@@ -247,7 +777,7 @@ class SharePointList(object):
         else:
             raise TypeError("row must be a dict or an instance of SharePointList.Row")
         self.rows  # Make sure self._rows exists.
-        self._rows.append(row)
+        self._add_row(row)
         return row
     
     def append_from(self, other_list):
@@ -258,7 +788,7 @@ class SharePointList(object):
         """
         Removes the row from the list.
         """
-        self._rows.remove(row)
+        self._remove_row(row)
         self._deleted_rows.add(row)
 
     def delete(self):
@@ -267,87 +797,340 @@ class SharePointList(object):
         """
         self.lists.remove(self)
 
-    def save(self):
+    def _save_chunks(self, chunk_size=500, rows=None):
         """
-        Updates the list with changes.
+        Yields (xml, rows_by_batch_id) pairs, each an UpdateListItems request
+        for at most chunk_size of the changes to the list, and a mapping from
+        its batch IDs to rows.
+        """
+        if rows is None:
+            rows = getattr(self, '_rows', ())
+        # Methods are built as they're needed. Rows are updated as earlier
+        # chunks return, so iterate over copies.
+        changes = itertools.chain(((row, row.get_batch_method()) for row in list(rows)),
+                                  ((row, E.Method(E.Field(text_type(row.id),
+                                                          Name='ID'),
+                                                  Cmd='Delete')) for row in list(self._deleted_rows)))
+        return self._batch_chunks(changes, chunk_size)
+
+    def _batch_chunks(self, changes, chunk_size=500):
+        """
+        Yields (xml, rows_by_batch_id) pairs as for _save_chunks(), given
+        (row, batch method) pairs. Pairs whose method is None are left out.
         """
         # Based on the documentation at
         # http://msdn.microsoft.com/en-us/library/lists.lists.updatelistitems%28v=office.12%29.aspx
 
-        # Note, this ends up un-namespaced. SharePoint doesn't care about
-        # namespaces on this XML node, and will bork if any of these elements
-        # have a namespace prefix. Likewise Method and Field in
-        # SharePointRow.get_batch_method().
-        batches = E.Batch(ListVersion='1', OnError='Return')
-        # Here's the root element of our SOAP request.
-        xml = SP.UpdateListItems(SP.listName(self.id), SP.updates(batches))
-
         # rows_by_batch_id contains a mapping from new rows to their batch
         # IDs, so we can set their IDs when they are returned by SharePoint.
-        rows_by_batch_id, batch_id = {}, 1
+        # Batch IDs are unique across chunks.
+        batches, rows_by_batch_id, batch_id = None, {}, 1
 
-        for row in self._rows:
-            batch = row.get_batch_method()
+        for row, batch in changes:
             if batch is None:
                 continue
+            if batches is None:
+                # Note, this ends up un-namespaced. SharePoint doesn't care
+                # about namespaces on this XML node, and will bork if any of
+                # these elements have a namespace prefix. Likewise Method and
+                # Field in SharePointRow.get_batch_method().
+                batches = E.Batch(ListVersion='1', OnError='Return')
+                # Here's the root element of our SOAP request.
+                xml = SP.UpdateListItems(SP.listName(self.id), SP.updates(batches))
             # Add the batch ID
             batch.attrib['ID'] = text_type(batch_id)
             rows_by_batch_id[batch_id] = row
             batches.append(batch)
             batch_id += 1
+            if len(batches) >= chunk_size:
+                yield xml, rows_by_batch_id
+                batches, rows_by_batch_id = None, {}
 
-        for row in self._deleted_rows:
-            batch = E.Method(E.Field(text_type(row.id),
-                                     Name='ID'),
-                             ID=text_type(batch_id), Cmd='Delete')
-            rows_by_batch_id[batch_id] = row
-            batches.append(batch)
-            batch_id += 1
+        if batches is not None:
+            yield xml, rows_by_batch_id
 
-        if len(batches) == 0:
-            return
+    def _post_save_chunk(self, chunk):
+        xml, rows_by_batch_id = chunk
+        try:
+            response = self.opener.post_soap(LIST_WEBSERVICE, xml,
+                                             soapaction='http://schemas.microsoft.com/sharepoint/soap/UpdateListItems')
+        except (URLError, IOError, OSError, http_client.HTTPException, etree.XMLSyntaxError) as e:
+            # The request failed, or its response couldn't be read. Either
+            # way, the other chunks carry on.
+            return None, e
+        return response, None
 
-        response = self.opener.post_soap(LIST_WEBSERVICE, xml,
-                                         soapaction='http://schemas.microsoft.com/sharepoint/soap/UpdateListItems')
+    def _save_failed(self, xml, rows_by_batch_id, error, save_result, batch_ids=None):
+        """
+        Records every row in a chunk (or those with the given batch IDs) as
+        failed, when the request itself failed.
+        """
+        for batch in xml.iter('Method'):
+            batch_id = int(batch.attrib['ID'])
+            if batch_ids is not None and batch_id not in batch_ids:
+                continue
+            save_result.failed.append(UpdateFailedError(rows_by_batch_id[batch_id], batch.attrib['Cmd'],
+                                                        type(error).__name__,
+                                                        text_type(error)))
 
+    def _save_results(self, response, rows_by_batch_id, save_result):
+        """
+        Updates rows from an UpdateListItems response, returning the batch
+        IDs that it had results for.
+        """
+        answered = set()
         for result in response.xpath('.//sp:Result', namespaces=namespaces):
             batch_id, batch_result = result.attrib['ID'].split(',')
             row = rows_by_batch_id[int(batch_id)]
+            answered.add(int(batch_id))
 
             error_code = result.find('sp:ErrorCode', namespaces=namespaces)
             error_text = result.find('sp:ErrorText', namespaces=namespaces)
             if error_code is not None and error_code.text != '0x00000000':
-                raise UpdateFailedError(row, batch_result,
-                                        error_code.text,
-                                        error_text.text)
+                save_result.failed.append(UpdateFailedError(row, batch_result,
+                                                            error_code.text,
+                                                            error_text.text))
+                continue
 
-            if batch_result in ('Update', 'New'):
+            if batch_result in ('Update', 'New', 'Moderate'):
                 row._update(result.xpath('z:row', namespaces=namespaces)[0],
                             clear=True)
+                if batch_result == 'New' and hasattr(self, '_rows_by_id'):
+                    self._rows_by_id[row.id] = row
+                self._reindex(row)
             else:
                 self._deleted_rows.remove(row)
+            save_result.saved.append(row)
+        return answered
+
+    def save(self, chunk_size=500, max_in_flight=None, rows=None):
+        """
+        Updates the list with changes to the given rows (by default, those in
+        self.rows), and removes deleted rows.
+
+        Changes are sent chunk_size rows at a time, with up to max_in_flight
+        requests (by default, the site's max_workers) being made at once. Rows
+        are updated from SharePoint's response as each request returns.
+
+        A row that fails to save keeps its changes, so that it can be saved
+        again later, and doesn't stop the others from being saved. Returns a
+        SaveResult saying which rows were saved and which weren't.
+        """
+        return self._post_chunks(self._save_chunks(chunk_size, rows), max_in_flight)
+
+    def _post_chunks(self, chunks, max_in_flight=None):
+        """
+        Sends UpdateListItems requests, each given as a pair of the request
+        and a mapping from batch ID to row, and updates the rows from the
+        responses. Returns a SaveResult.
+        """
+        if max_in_flight is None:
+            max_in_flight = self.opener.max_workers
+        save_result = SaveResult()
+        for chunk, (response, error) in concurrent_imap_unordered(self._post_save_chunk, chunks, max_in_flight):
+            xml, rows_by_batch_id = chunk
+            if error is not None:
+                self._save_failed(xml, rows_by_batch_id, error, save_result)
+            else:
+                self._save_response(xml, response, rows_by_batch_id, save_result)
+        return save_result
+
+    def _save_response(self, xml, response, rows_by_batch_id, save_result):
+        answered = self._save_results(response, rows_by_batch_id, save_result)
+        if len(answered) < len(rows_by_batch_id):
+            self._save_failed(xml, rows_by_batch_id, SharePointException("No result in the response"),
+                              save_result, set(rows_by_batch_id) - answered)
+
+    def download_attachments(self, dest, jobs=4, chunk_size=CHUNK_SIZE):
+        """
+        Downloads the attachments of every row to dest/<row ID>/<filename>.
+
+        Attachment URLs are fetched along with the rows, rather than with a
+        request per row, and up to jobs files are downloaded at once, each
+        streamed to disk chunk_size bytes at a time. Files already downloaded
+        whose size and ETag haven't changed are skipped.
+
+        Returns a DownloadResult.
+        """
+        if 'Attachments' not in self.fields:
+            return DownloadResult()
+
+        def attachments():
+            rows = self._iter_rows(self._field_groups(['Attachments']),
+                                   options={'IncludeAttachmentUrls': 'TRUE'})
+            for row in rows:
+                for attachment in self._inline_attachments(row):
+                    yield text_type(row.id) + '/' + url_filename(attachment.url), attachment.url
+
+        def fetch(manifest, relative_path, url):
+            return download(self.opener, url, manifest.local_path(relative_path), chunk_size,
+                            manifest.get(relative_path))
+
+        return self._download_all(dest, attachments(), fetch, jobs)
+
+    def mirror(self, dest_dir, jobs=4, chunk_size=CHUNK_SIZE):
+        """
+        Downloads the files in this document library, including those in
+        folders, to the same paths under dest_dir.
+
+        Only files whose Modified time or size has changed since they were
+        last mirrored to dest_dir are downloaded, up to jobs at once, and
+        interrupted downloads are resumed. Files deleted from the library
+        are left in dest_dir.
 
-        assert not self._deleted_rows
-        assert not any(row._changed for row in self.rows)
+        Returns a DownloadResult.
+        """
+        if 'FileRef' not in self.fields:
+            raise ValueError("{0!r} isn't a document library".format(self))
+        field_names = [name for name in ('FileRef', 'FSObjType', 'File_x0020_Size', 'Modified')
+                       if name in self.fields]
+        root_folder = self.meta.get('RootFolder', '').strip('/')
+
+        def files():
+            rows = self._iter_rows(self._field_groups(field_names),
+                                   options={'ViewAttributes': {'Scope': 'Recursive'}})
+            for row in rows:
+                if row._file_info('FSObjType') == '1':
+                    continue  # a folder
+                file_ref = row._file_info('FileRef').strip('/')
+                if root_folder and file_ref.startswith(root_folder + '/'):
+                    file_ref = file_ref[len(root_folder) + 1:]
+                relative_path = '/'.join(safe_filename(part) for part in file_ref.split('/'))
+                yield relative_path, row
+
+        def fetch(manifest, relative_path, row):
+            entry = manifest.get(relative_path)
+            state = {'modified': row._file_info('Modified'), 'file_size': row._file_info('File_x0020_Size')}
+            if entry and all(entry.get(key) == value for key, value in state.items()):
+                return None
+            downloaded = row.download_to(manifest.local_path(relative_path), chunk_size, entry)
+            # Record the new state even if only the metadata changed
+            if downloaded is None:
+                entry.update(state)
+            else:
+                downloaded.update(state)
+            return downloaded
+
+        return self._download_all(dest_dir, files(), fetch, jobs)
+
+    def _download_all(self, dest, files, fetch, jobs):
+        """
+        Calls fetch(manifest, relative_path, source) for each (relative_path,
+        source) pair in files, from up to jobs threads at once, recording
+        what it returns in the manifest for dest.
+        """
+        result, manifest = DownloadResult(), Manifest(dest)
+
+        def fetch_file(file):
+            try:
+                return fetch(manifest, *file), None
+            except (URLError, IOError) as e:
+                return None, e
+
+        try:
+            for (relative_path, source), (downloaded, error) in concurrent_imap_unordered(fetch_file, files, jobs):
+                path = manifest.local_path(relative_path)
+                if error is not None:
+                    result.failed.append((path, error))
+                elif downloaded is None:
+                    result.skipped.append(path)
+                else:
+                    manifest.put(relative_path, downloaded)
+                    result.downloaded.append(path)
+        finally:
+            manifest.save()
+        return result
+
+    def _inline_attachments(self, row):
+        # With IncludeAttachmentUrls, the Attachments field holds the URLs
+        # separated by ';#', rather than a 0 or 1.
+        try:
+            value = row._get('Attachments') or ''
+        except KeyError:
+            value = ''
+        urls = [url for url in value.split(';#') if '/' in url]
+        row._attachments = SharePointAttachments(self.opener, self.id, row.id, urls)
+        return row._attachments
+
+
+class SharePointListProjection(object):
+    """
+    The rows of a list, with only some of their fields fetched.
+
+    Rows are fetched with just the given fields in their ViewFields, so less
+    is downloaded, and fewer requests are needed when lookup fields are left
+    out. Fields that weren't fetched read as if they were empty: None, or ''
+    for text fields and [] for multi-valued fields. Rows can be changed and
+    saved with the list's save() as usual.
+    """
+
+    def __init__(self, sp_list, fields):
+        self.list, self.fields = sp_list, list(fields)
+
+    def __repr__(self):
+        return '<SharePointListProjection {0} {1!r}>'.format(self.list.id, self.fields)
+
+    def iter_rows(self, folder='', page_size=5000):
+        return self.list.iter_rows(folder, page_size, self.fields)
+
+    def get_rows(self, folder='', page_size=5000):
+        return list(self.iter_rows(folder, page_size))
+
+    @property
+    def rows(self):
+        if not hasattr(self, '_rows'):
+            self._rows = self.get_rows()
+        return list(self._rows)
+
+    @property
+    def rows_by_id(self):
+        if not hasattr(self, '_rows_by_id'):
+            self._rows_by_id = dict((row.id, row) for row in self.rows)
+        return self._rows_by_id
+
+    def save(self, chunk_size=500, max_in_flight=None):
+        """
+        Updates the list with changes to these rows. See SharePointList.save().
+        """
+        return self.list.save(chunk_size, max_in_flight, getattr(self, '_rows', ()))
+
+
+# Marks a field that has been decoded, but has no value
+absent = object()
 
 
 class SharePointListRow(object):
-    # fields, list and opener are added as class attributes in SharePointList.Row
+    # fields, list and opener are added as class attributes in SharePointList.Row,
+    # along with _field_list, _field_index and _attrib_keys, which give the
+    # position of each field in _values, and _parsers, which decode each
+    # field's raw value.
+
+    # Values are held in _values by field position. Until a field is decoded
+    # (as recorded in the _decoded bitmask), its entry holds the raw ows_*
+    # attribute. _changed is a bitmask of fields changed since the row was
+    # last loaded.
+    __slots__ = ('_values', '_decoded', '_changed', 'id', '_attachments')
 
     def __init__(self, row=None, attrib=None):
         self._update(row, attrib, clear=True)
 
     def _update(self, row, attrib=None, clear=False):
         if clear:
-            self._data = {}
-            self._changed = set()
+            self._values = [absent] * len(self._field_list)
+            self._decoded = (1 << len(self._field_list)) - 1
+            self._changed = 0
         if isinstance(row, etree._Element):
             attrib = row.attrib
         if attrib:
-            for field in self.fields.values():
-                value = field.parse(attrib)
-                if value is not None:
-                    self._data[field.name] = value
+            # Fields are decoded when they're first needed, in _get().
+            if clear:
+                self._values = [attrib.get(key) for key in self._attrib_keys]
+                self._decoded = 0
+            else:
+                for index, key in enumerate(self._attrib_keys):
+                    if key in attrib:
+                        self._values[index] = attrib[key]
+                        self._decoded &= ~(1 << index)
         elif isinstance(row, dict):
             for key in row:
                 setattr(self, key, row[key])
@@ -358,6 +1141,32 @@ class SharePointListRow(object):
         except AttributeError:
             self.id = None
 
+    def _get(self, name):
+        """
+        Returns the value of the named field, decoding it from the raw
+        attribute the first time it's needed. Raises KeyError if the field
+        has no value.
+        """
+        index = self._field_index[name]
+        value = self._values[index]
+        if not self._decoded >> index & 1:
+            value = self._parsers[index](value)
+            if value is None:
+                value = absent
+            self._values[index] = value
+            self._decoded |= 1 << index
+        if value is absent:
+            raise KeyError(name)
+        return value
+
+    def _set(self, name, value):
+        index = self._field_index[name]
+        self._values[index] = value
+        self._decoded |= 1 << index
+        self._changed |= 1 << index
+        if self.list._indexes:
+            self.list._reindex(self, name)
+
     def __repr__(self):
         return "<SharePointListRow {0} {1}>".format(self.id, repr(self.name))
 
@@ -381,9 +1190,9 @@ class SharePointListRow(object):
         batch_method = E.Method(Cmd='Update' if self.id else 'New')
         batch_method.append(E.Field(text_type(self.id) if self.id else 'New',
                                     Name='ID'))
-        for field in self.fields.values():
-            if field.name in self._changed:
-                value = field.unparse(self._data[field.name] or '')
+        for index, field in enumerate(self._field_list):
+            if self._changed >> index & 1:
+                value = field.unparse(self._values[index] or '')
                 batch_method.append(E.Field(value, Name=field.name))
         return batch_method
 
@@ -396,12 +1205,12 @@ class SharePointListRow(object):
         row_element = OUT('row', fields_element, id=text_type(self.id))
         for field in self.fields.values():
             try:
-                data = self._data[field.name]
+                data = self._get(field.name)
             except KeyError:
                 pass
             else:
                 fields_element.append(field.as_xml(self, data, **kwargs))
-        if transclude_xml and self.is_file and self._data.get('DocIcon') == 'xml':
+        if transclude_xml and self.is_file and getattr(self, 'DocIcon', None) == 'xml':
             try:
                 content = etree.parse(self.open()).getroot()
             except HTTPError:
@@ -434,9 +1243,45 @@ class SharePointListRow(object):
     def open(self):
         url = self.opener.relative(quote(self.list.meta['Title']) + '/' + quote(self.LinkFilename.encode('utf-8')))
         request = Request(url)
+        request.operation = 'open'
         request.add_header('Translate', 'f')
         return self.opener.open(request)
 
+    def _file_info(self, name):
+        """
+        Returns a document library field as text. Fields such as FileRef and
+        File_x0020_Size are lookups on the library, with the value we want as
+        the lookup's title.
+        """
+        try:
+            value = self._get(name)
+        except KeyError:
+            return None
+        if isinstance(value, dict):
+            return value['title']
+        elif isinstance(value, datetime.datetime):
+            return value.isoformat()
+        return text_type(value)
+
+    def download_to(self, path, chunk_size=CHUNK_SIZE, validators=None):
+        """
+        Downloads this document to path, chunk_size bytes at a time.
+
+        If an earlier download was interrupted, it is carried on from where
+        it stopped, as long as the document hasn't changed in between.
+        validators is what an earlier call returned; if given, the document
+        is only downloaded if its ETag or Last-Modified time has changed.
+
+        Returns a dict of the document's etag, last_modified and size, or
+        None if it hadn't changed.
+        """
+        file_ref = self._file_info('FileRef')
+        if file_ref:
+            url = urljoin(self.opener.base_url, '/' + file_ref.lstrip('/'))
+        else:
+            url = self.opener.relative(quote(self.list.meta['Title']) + '/' + quote(self.LinkFilename.encode('utf-8')))
+        return download(self.opener, url, path, chunk_size, validators, {'Translate': 'f'})
+
     @property
     def attachments(self):
         if not hasattr(self, '_attachments'):
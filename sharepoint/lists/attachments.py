@@ -1,11 +1,40 @@
-from sharepoint.xml import namespaces, SP
+import io
+
+from six import binary_type, text_type
+from six.moves.urllib.error import URLError
+from six.moves.urllib.request import Request
+
+from sharepoint.xml import namespaces, SP, StreamingSOAPBody
 from sharepoint.lists.definitions import LIST_WEBSERVICE
+from sharepoint.utils import concurrent_imap_unordered
+
+
+class AddResult(object):
+    """
+    The outcome of adding several attachments.
+
+    added holds the new SharePointAttachments, and failed a (filename, error)
+    pair for each file that couldn't be added. An AddResult is true if no
+    files failed.
+    """
+
+    def __init__(self):
+        self.added, self.failed = [], []
+
+    def __bool__(self):
+        return not self.failed
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return "<AddResult {0} added, {1} failed>".format(len(self.added), len(self.failed))
 
 
 class SharePointAttachments(object):
-    def __init__(self, opener, list_id, row_id):
+    def __init__(self, opener, list_id, row_id, urls=None):
         self.opener = opener
         self.list_id, self.row_id = list_id, row_id
+        # The URLs, if they came with the row, which saves asking for them
+        self.urls = urls
 
     def __iter__(self):
         """
@@ -13,6 +42,10 @@ class SharePointAttachments(object):
 
         Implements http://msdn.microsoft.com/en-us/library/websvclists.lists.getattachmentcollection.aspx
         """
+        if self.urls is not None:
+            for url in list(self.urls):
+                yield SharePointAttachment(self, url)
+            return
         xml = SP.GetAttachmentCollection(SP.listName(self.list_id),
                                          SP.listItemID(str(self.row_id)))
         response = self.opener.post_soap(
@@ -22,13 +55,77 @@ class SharePointAttachments(object):
             yield SharePointAttachment(self, url.text)
 
     def delete(self, url):
-        raise NotImplementedError
+        """
+        Removes the attachment at url from the list item.
+
+        Implements http://msdn.microsoft.com/en-us/library/websvclists.lists.deleteattachment.aspx
+        """
+        xml = SP.DeleteAttachment(SP.listName(self.list_id),
+                                  SP.listItemID(str(self.row_id)),
+                                  SP.url(url))
+        self.opener.post_soap(
+            LIST_WEBSERVICE, xml,
+            soapaction='http://schemas.microsoft.com/sharepoint/soap/DeleteAttachment')
+        if self.urls is not None and url in self.urls:
+            self.urls.remove(url)
 
     def add(self, filename, content):
-        raise NotImplementedError
+        """
+        Attaches a file to the list item, returning a SharePointAttachment.
+
+        content is a file object, which is read from its current position a
+        chunk at a time as the request is sent, so that large files are never
+        held in memory all at once. It can also be bytes.
+
+        Implements http://msdn.microsoft.com/en-us/library/websvclists.lists.addattachment.aspx
+        """
+        if isinstance(content, binary_type):
+            content = io.BytesIO(content)
+        attachment = SP.attachment()
+        xml = SP.AddAttachment(SP.listName(self.list_id),
+                               SP.listItemID(str(self.row_id)),
+                               SP.fileName(filename),
+                               attachment)
+        response = self.opener.post_soap(
+            LIST_WEBSERVICE, StreamingSOAPBody(xml, attachment, content),
+            soapaction='http://schemas.microsoft.com/sharepoint/soap/AddAttachment')
+        url = text_type(response.xpath('string(sp:AddAttachmentResult)', namespaces=namespaces))
+        if self.urls is not None:
+            self.urls.append(url)
+        return SharePointAttachment(self, url)
+
+    def add_many(self, files, max_in_flight=None):
+        """
+        Attaches several files to the list item, with up to max_in_flight
+        (by default, the site's max_workers) being uploaded at once.
+
+        files is an iterable of (filename, content) pairs, where content is
+        as for add(). It is consumed as uploads start, so can be a generator
+        that opens each file when it's needed.
+
+        A file that fails to upload doesn't stop the others. Returns an
+        AddResult.
+        """
+        if max_in_flight is None:
+            max_in_flight = self.opener.max_workers
+        result = AddResult()
+        for (filename, content), (attachment, error) in concurrent_imap_unordered(self._add, files, max_in_flight):
+            if error is not None:
+                result.failed.append((filename, error))
+            else:
+                result.added.append(attachment)
+        return result
+
+    def _add(self, file):
+        try:
+            return self.add(*file), None
+        except (URLError, IOError) as e:
+            return None, e
 
     def open(self, url):
-        return self.opener.open(url)
+        request = Request(url)
+        request.operation = 'open'
+        return self.opener.open(request)
 
 
 class SharePointAttachment(object):
@@ -46,4 +143,3 @@ class SharePointAttachment(object):
 
     def __repr__(self):
         return "<{0} '{1}'>".format(type(self).__name__, self.url)
-
@@ -0,0 +1,62 @@
+"""
+An on-disk cache of list settings, so that they needn't be fetched with
+GetList every time a site is used.
+"""
+
+import errno
+import hashlib
+import os
+import tempfile
+
+from lxml import etree
+
+
+class ListSettingsCache(object):
+    """
+    Stores the settings of each list, as returned by GetList and including its
+    field definitions, in a directory with a file per list.
+
+    Cached settings are only used while their Version and Modified attributes
+    match those in the site's list collection.
+    """
+    freshness_attributes = ('Version', 'Modified')
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, base_url, list_id):
+        site_key = hashlib.sha1(base_url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, site_key, list_id.strip('{}').lower() + '.xml')
+
+    def get(self, base_url, list_element):
+        """
+        Returns the cached settings for the list described by list_element
+        (from GetListCollection), or None if there are none or they're stale.
+        """
+        freshness = [list_element.get(name) for name in self.freshness_attributes]
+        if not any(freshness):
+            return None
+        try:
+            settings = etree.parse(self._path(base_url, list_element.attrib['ID'])).getroot()
+        except (IOError, OSError, etree.XMLSyntaxError):
+            return None
+        if [settings.get(name) for name in self.freshness_attributes] != freshness:
+            return None
+        return settings
+
+    def put(self, base_url, settings):
+        """
+        Stores the settings for a list, as returned by GetList.
+        """
+        path = self._path(base_url, settings.attrib['ID'])
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        # Write to a temporary file first so that readers never see a
+        # partially-written file.
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(etree.tostring(settings))
+        os.rename(temp_path, path)
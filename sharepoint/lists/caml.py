@@ -0,0 +1,198 @@
+"""
+Builds CAML queries, for having SharePoint filter and sort rows itself.
+
+Conditions are made by naming a field and giving a value, and can be combined
+with And and Or, or with & and |::
+
+    from sharepoint.lists.caml import Eq, Gt, IsNull
+
+    where = Eq('Status', 'Open') & (Gt('Modified', since) | IsNull('Owner'))
+    rows = sp_list.query(where=where, order_by=['-Modified'])
+
+Values are encoded according to the type of the field they're compared with.
+datetime and date values compare with date/time fields, and lookup and user
+fields can be compared by ID (by passing an int, a row or a user) or by title
+(by passing a string).
+"""
+
+import datetime
+
+from lxml.builder import E
+
+from six import text_type, integer_types
+
+from ..users import SharePointUser
+from . import moderation
+
+__all__ = ['Eq', 'Neq', 'Lt', 'Leq', 'Gt', 'Geq', 'In', 'IsNull', 'IsNotNull',
+           'Contains', 'BeginsWith', 'And', 'Or', 'query_xml']
+
+
+class Condition(object):
+    def as_xml(self, fields):
+        """
+        Returns the CAML for this condition, given the fields of the list
+        being queried.
+        """
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+
+class Comparison(Condition):
+    tag = None
+
+    def __init__(self, name, value):
+        self.name, self.value = name, value
+
+    def as_xml(self, fields):
+        field = fields[self.name]
+        by_id = _is_lookup_id(field, self.value)
+        return getattr(E, self.tag)(_field_ref(field, by_id), _value(field, self.value, by_id))
+
+    def __repr__(self):
+        return '{0}({1!r}, {2!r})'.format(type(self).__name__, self.name, self.value)
+
+
+class Eq(Comparison):
+    tag = 'Eq'
+
+
+class Neq(Comparison):
+    tag = 'Neq'
+
+
+class Lt(Comparison):
+    tag = 'Lt'
+
+
+class Leq(Comparison):
+    tag = 'Leq'
+
+
+class Gt(Comparison):
+    tag = 'Gt'
+
+
+class Geq(Comparison):
+    tag = 'Geq'
+
+
+class Contains(Comparison):
+    tag = 'Contains'
+
+
+class BeginsWith(Comparison):
+    tag = 'BeginsWith'
+
+
+class In(Condition):
+    """
+    Matches rows where the field has any of the given values.
+    """
+    def __init__(self, name, values):
+        self.name, self.values = name, list(values)
+
+    def as_xml(self, fields):
+        field = fields[self.name]
+        by_id = any(_is_lookup_id(field, value) for value in self.values)
+        return E.In(_field_ref(field, by_id),
+                    E.Values(*(_value(field, value, by_id) for value in self.values)))
+
+    def __repr__(self):
+        return 'In({0!r}, {1!r})'.format(self.name, self.values)
+
+
+class IsNull(Condition):
+    tag = 'IsNull'
+
+    def __init__(self, name):
+        self.name = name
+
+    def as_xml(self, fields):
+        return getattr(E, self.tag)(_field_ref(fields[self.name]))
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(type(self).__name__, self.name)
+
+
+class IsNotNull(IsNull):
+    tag = 'IsNotNull'
+
+
+class And(Condition):
+    tag = 'And'
+
+    def __init__(self, *conditions):
+        if len(conditions) < 2:
+            raise ValueError("{0} needs at least two conditions".format(type(self).__name__))
+        self.conditions = conditions
+
+    def as_xml(self, fields):
+        # CAML's And and Or only take two conditions each, so nest them
+        xml = self.conditions[-1].as_xml(fields)
+        for condition in reversed(self.conditions[:-1]):
+            xml = getattr(E, self.tag)(condition.as_xml(fields), xml)
+        return xml
+
+    def __repr__(self):
+        return '{0}({1})'.format(type(self).__name__, ', '.join(map(repr, self.conditions)))
+
+
+class Or(And):
+    tag = 'Or'
+
+
+def _is_lookup_id(field, value):
+    from . import SharePointListRow  # lets avoid a circular import
+    if field.sharepoint_type not in ('Lookup', 'LookupMulti', 'User', 'UserMulti'):
+        return False
+    return isinstance(value, integer_types + (SharePointListRow, SharePointUser))
+
+
+def _field_ref(field, by_id=False):
+    field_ref = E.FieldRef(Name=field.name)
+    if by_id:
+        field_ref.attrib['LookupId'] = 'TRUE'
+    return field_ref
+
+
+def _value(field, value, by_id=False):
+    if by_id:
+        return E.Value(text_type(getattr(value, 'id', value)), Type='Integer')
+    elif isinstance(value, datetime.datetime):
+        return E.Value(value.strftime('%Y-%m-%dT%H:%M:%S'), Type='DateTime', IncludeTimeValue='TRUE')
+    elif isinstance(value, datetime.date):
+        return E.Value(value.isoformat(), Type='DateTime')
+    elif isinstance(value, bool):
+        return E.Value('1' if value else '0', Type=field.sharepoint_type)
+    elif isinstance(value, moderation.ModerationStatus):
+        return E.Value(text_type(value.value), Type=field.sharepoint_type)
+    return E.Value(text_type(value), Type=field.sharepoint_type)
+
+
+def query_xml(fields, where=None, order_by=None):
+    """
+    Returns a CAML Query element, or None if there's nothing to query on.
+
+    where is a Condition, or a CAML element written by hand. order_by is a
+    list of field names, each prefixed with '-' to sort in descending order.
+    """
+    query = E.Query()
+    if where is not None:
+        if isinstance(where, Condition):
+            where = where.as_xml(fields)
+        query.append(E.Where(where))
+    if order_by:
+        order_by_element = E.OrderBy()
+        for name in order_by:
+            if name.startswith('-'):
+                order_by_element.append(E.FieldRef(Name=fields[name[1:]].name, Ascending='FALSE'))
+            else:
+                order_by_element.append(E.FieldRef(Name=fields[name].name))
+        query.append(order_by_element)
+    return query if len(query) else None
@@ -0,0 +1,88 @@
+from six import binary_type, string_types
+from six.moves import collections_abc
+
+
+def _hashable(value):
+    # Lookup and user values are dicts, so index them by their IDs
+    if isinstance(value, dict):
+        return value['id'] if 'id' in value else tuple(sorted(value.items()))
+    elif isinstance(value, collections_abc.Iterable) and not isinstance(value, string_types + (binary_type,)):
+        # Values of multi-valued fields
+        return tuple(_hashable(subvalue) for subvalue in value)
+    return value
+
+
+class RowIndex(collections_abc.Mapping):
+    """
+    A hash index of a list's rows by the values of one or more fields.
+
+    Maps each value (or for several fields, each tuple of values) to a list
+    of the rows that have it. Lookup and user fields are indexed by ID, and
+    fields without a value by None.
+
+    Indexes are made with SharePointList.index_by(), and kept up to date as
+    rows are appended to or removed from the list, changed, or refreshed by
+    save() and sync().
+    """
+
+    def __init__(self, field_names, rows=()):
+        self.field_names = tuple(field_names)
+        self.rebuild(rows)
+
+    def __repr__(self):
+        return '<RowIndex {0!r}, {1} keys>'.format(self.field_names, len(self))
+
+    def key(self, row):
+        """
+        Returns the key under which row is indexed.
+        """
+        values = []
+        for name in self.field_names:
+            try:
+                values.append(_hashable(row._get(name)))
+            except KeyError:
+                values.append(None)
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def rebuild(self, rows):
+        """
+        Replaces the contents of the index with rows.
+        """
+        self._rows_by_key, self._keys = {}, {}
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        key = self.key(row)
+        self._keys[row] = key
+        self._rows_by_key.setdefault(key, []).append(row)
+
+    def discard(self, row):
+        if row not in self._keys:
+            return
+        key = self._keys.pop(row)
+        rows = self._rows_by_key[key]
+        rows.remove(row)
+        if not rows:
+            del self._rows_by_key[key]
+
+    def update(self, row):
+        """
+        Moves row to its new key if it has changed. Rows that aren't in the
+        index are left out of it.
+        """
+        if row in self._keys and self._keys[row] != self.key(row):
+            self.discard(row)
+            self.add(row)
+
+    def __getitem__(self, key):
+        return list(self._rows_by_key[key])
+
+    def __iter__(self):
+        return iter(self._rows_by_key)
+
+    def __len__(self):
+        return len(self._rows_by_key)
+
+    def __contains__(self, key):
+        return key in self._rows_by_key
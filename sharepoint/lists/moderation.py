@@ -2,10 +2,6 @@ from lxml.builder import E
 
 from six import text_type
 
-from sharepoint.xml import SP, namespaces
-
-LIST_WEBSERVICE = '_vti_bin/Lists.asmx'
-
 
 class ModerationStatus(object):
     def __init__(self, value, label):
@@ -32,7 +28,7 @@ moderation_statuses = {0: APPROVED,
 
 def _moderation_status_filter(status):
     def status_filter(self):
-        return (r for r in self._list.rows if r._ModerationStatus == status)
+        return self.rows_by_status(status)
     status_filter.__name__ = status.label
     return property(status_filter)
 
@@ -47,50 +43,47 @@ class Moderation(object):
     draft = _moderation_status_filter(DRAFT)
     scheduled = _moderation_status_filter(SCHEDULED)
 
-    def rows_by_status(self, status):
-        return (r for r in self._list.rows if r._ModerationStatus == status)
+    def rows_by_status(self, status, fields=None, page_size=5000):
+        """
+        Yields the rows with the given moderation status, fetching them page
+        by page. SharePoint does the filtering, so only those rows are
+        downloaded.
+
+        If fields is given, only the named fields are fetched, and the others
+        read as if they were empty. The rows yielded aren't added to the
+        list's rows.
+        """
+        from sharepoint.lists import caml  # lets avoid a circular import
+        if isinstance(status, int):
+            status = moderation_statuses[status]
+        query = caml.query_xml(self._list.fields, caml.Eq('_ModerationStatus', status))
+        return self._list._iter_rows(self._list._field_groups(fields), page_size=page_size, query=query)
 
-    def set_status(self, rows, status, comment=None):
-        rows_by_batch_id, batch_id = {}, 1
-        
+    def set_status(self, rows, status, comment=None, chunk_size=500, max_in_flight=None):
+        """
+        Sets the moderation status of rows, with an optional comment.
+
+        Rows are sent chunk_size at a time, with up to max_in_flight requests
+        (by default, the site's max_workers) being made at once, and updated
+        from SharePoint's response. rows can be a generator, such as one of
+        the status views, which is consumed as requests are made.
+
+        A row that fails doesn't stop the others. Returns a SaveResult saying
+        which rows were moderated and which weren't.
+        """
         if isinstance(status, int):
             status = moderation_statuses[status]
-        
-        batches = E.Batch(ListVersion='1', OnError='Return')
-        # Here's the root element of our SOAP request.
-        xml = SP.UpdateListItems(SP.listName(self._list.id), SP.updates(batches))
-
-        if comment:
-            comment = E.Field(text_type(comment),
-                              Name='_ModerationComment')
-        
-        for row in rows:
-            batch = E.Method(E.Field(text_type(row.id),
-                                     Name='ID'),
-                             E.Field(text_type(status.value),
-                                     Name='_ModerationStatus'),
-                             ID=text_type(batch_id), Cmd='Moderate')
-            if comment:
-                batch.append(comment)
-            rows_by_batch_id[batch_id] = row
-            batches.append(batch)
-            batch_id += 1
-
-        response = self._list.opener.post_soap(
-            LIST_WEBSERVICE, xml,
-            soapaction='http://schemas.microsoft.com/sharepoint/soap/UpdateListItems')
-        
-        for result in response.xpath('.//sp:Result', namespaces=namespaces):
-            batch_id, batch_result = result.attrib['ID'].split(',')
-            row = rows_by_batch_id[int(batch_id)]
-
-            error_code = result.find('sp:ErrorCode', namespaces=namespaces)
-            error_text = result.find('sp:ErrorText', namespaces=namespaces)
-            if error_code is not None and error_code.text != '0x00000000':
-                raise UpdateFailedError(row, batch_result,
-                                        error_code.text,
-                                        error_text.text)
-
-            if batch_result == 'Moderate':
-                row._update(result.xpath('z:row', namespaces=namespaces)[0],
-                            clear=True)
+
+        def changes():
+            for row in rows:
+                batch = E.Method(E.Field(text_type(row.id),
+                                         Name='ID'),
+                                 E.Field(text_type(status.value),
+                                         Name='_ModerationStatus'),
+                                 Cmd='Moderate')
+                if comment:
+                    batch.append(E.Field(text_type(comment),
+                                         Name='_ModerationComments'))
+                yield row, batch
+
+        return self._list._post_chunks(self._list._batch_chunks(changes(), chunk_size), max_in_flight)
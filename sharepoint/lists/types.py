@@ -18,8 +18,9 @@ class FieldDescriptor(object):
         self.immutable = immutable
 
     def __get__(self, instance, owner):
+        # Values are decoded on first access; see SharePointListRow._get()
         try:
-            return self.field.descriptor_get(instance, instance._data[self.field.name])
+            return self.field.descriptor_get(instance, instance._get(self.field.name))
         except KeyError:
             return None
 
@@ -28,21 +29,28 @@ class FieldDescriptor(object):
             raise AttributeError("Field '{0}' is immutable".format(self.field.name))
 
         new_value = self.field.descriptor_set(instance, value)
-        if not self.field.is_equal(new_value, instance._data.get(self.field.name)):
-            instance._data[self.field.name] = new_value
-            instance._changed.add(self.field.name)
+        if not self.field.is_equal(new_value, self._original(instance)):
+            instance._set(self.field.name, new_value)
+
+    def _original(self, instance):
+        try:
+            return instance._get(self.field.name)
+        except KeyError:
+            return None
 
 
 class MultiFieldDescriptor(FieldDescriptor):
     def __get__(self, instance, owner):
-        values = instance._data.get(self.field.name, ())
+        try:
+            values = instance._get(self.field.name)
+        except KeyError:
+            values = ()
         return [self.field.descriptor_get(instance, value) for value in values]
 
     def __set__(self, instance, values):
         new_value = [self.field.descriptor_set(instance, value) for value in values]
-        if not self.field.is_equal(new_value, instance._data.get(self.field.name)):
-            instance._data[self.field.name] = new_value
-            instance._changed.add(self.field.name)
+        if not self.field.is_equal(new_value, self._original(instance)):
+            instance._set(self.field.name, new_value)
 
 
 class Field(object):
@@ -62,7 +70,12 @@ class Field(object):
             self.multi = xml.attrib.get('Mult') == 'TRUE'
 
     def parse(self, attrib):
-        value = attrib.get('ows_' + self.name)
+        return self.parse_value(attrib.get('ows_' + self.name))
+
+    def parse_value(self, value):
+        """
+        Decodes a raw value for this field, as found in an ows_* attribute.
+        """
         if value in empty_values:
             return self.default_value
 
@@ -90,7 +103,7 @@ class Field(object):
                 # if we have [['']], then remove the last entry
                 if values and values[-1] and not values[-1][0]:
                     del values[-1]
-                return map(self._parse, values)
+                return [self._parse(v) for v in values]
             else:
                 return [self._parse(v) for v in values if v not in empty_values]
         elif self.group_multi:
@@ -99,19 +112,30 @@ class Field(object):
         else:
             return self._parse(value)
 
+    def value_parser(self):
+        """
+        Returns a function that decodes raw values for this field, as
+        parse_value() does, but with the checks that don't apply to this
+        field already made.
+        """
+        if self.multi or self.group_multi is not None:
+            return self.parse_value
+        parse, default_value = self._parse, self.default_value
+        return lambda value: parse(value) if value else default_value
+
     def unparse(self, value):
         if value in empty_values:
             return ''
 
         if self.group_multi is not None and self.multi:
-            value = map(self._unparse, value)
+            value = [self._unparse(v) for v in value]
             assert all(len(v) == self.group_multi for v in value)
             value = list(itertools.chain(*value))
         elif self.group_multi is not None:
             value = self._unparse(value)
             assert len(value) == self.group_multi
         elif self.multi:
-            value = map(self._unparse, value)
+            value = [self._unparse(v) for v in value]
 
         if self.group_multi is not None or self.multi:
             values = [subvalue.replace(';', ';;') for subvalue in value]
@@ -197,6 +221,11 @@ class TextField(Field):
     def _parse(self, value):
         return value or ''
 
+    def value_parser(self):
+        if self.multi:
+            return self.parse_value
+        return lambda value: value or ''
+
     def _unparse(self, value):
         return value or ''
 
@@ -212,11 +241,23 @@ class LookupField(Field):
     def _parse(self, value):
         return {'list': self.lookup_list, 'id': int(value[0]), 'title': value[1]}
 
+    def value_parser(self):
+        if self.multi:
+            return self.parse_value
+        lookup_list = self.lookup_list
+
+        def parse(value):
+            if not value:
+                return None
+            value = value.split(';#', 1)
+            return {'list': lookup_list, 'id': int(value[0]), 'title': value[1]}
+        return parse
+
     def _unparse(self, value):
         return [text_type(value['id']), value['title'] or '']
 
     def descriptor_get(self, row, value):
-        return row.list.lists[value['list']].rows_by_id[value['id']]
+        return row.list.lists[value['list']]._get_lookup_row(value['id'], row.list, self.name)
 
     def descriptor_set(self, row, value):
         from . import SharePointListRow  # lets avoid a circular import
@@ -292,8 +333,8 @@ class ChoiceField(Field):
 class MultiChoiceField(ChoiceField):
     multi = True
 
-    def parse(self, xml):
-        values = super(MultiChoiceField, self).parse(xml)
+    def parse_value(self, value):
+        values = super(MultiChoiceField, self).parse_value(value)
         if values is not None:
             return [value for value in values if value]
 
@@ -304,6 +345,22 @@ class DateTimeField(Field):
     def _parse(self, value):
         return datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
 
+    def value_parser(self):
+        if self.multi:
+            return self.parse_value
+        parse = self._parse
+
+        def parse_fixed_width(value):
+            if not value:
+                return None
+            # strptime() is slow, so pick apart the usual format by hand
+            if len(value) == 19 and value[4] == value[7] == '-' and value[10] == ' ' \
+               and value[13] == value[16] == ':':
+                return datetime.datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                                         int(value[11:13]), int(value[14:16]), int(value[17:19]))
+            return parse(value)
+        return parse_fixed_width
+
     def _unparse(self, value):
         return value.isoformat(' ')
 
@@ -329,6 +386,11 @@ class CounterField(Field):
     def _parse(self, value):
         return int(value)
 
+    def value_parser(self):
+        if self.multi:
+            return self.parse_value
+        return lambda value: int(value) if value else None
+
     def _as_xml(self, row, value, **kwargs):
         return OUT('int', text_type(value))
 
@@ -339,6 +401,11 @@ class NumberField(Field):
     def _parse(self, value):
         return float(value)
 
+    def value_parser(self):
+        if self.multi:
+            return self.parse_value
+        return lambda value: float(value) if value else None
+
     def _unparse(self, value):
         return text_type(value)
 
@@ -357,6 +424,11 @@ class IntegerField(NumberField):
     def _parse(self, value):
         return int(value)
 
+    def value_parser(self):
+        if self.multi:
+            return self.parse_value
+        return lambda value: int(value) if value else None
+
     def descriptor_set(self, row, value):
         if value is None:
             return None
@@ -391,6 +463,19 @@ class UserField(Field):
         assert len(value) == 2
         return {'id': int(value[0]), 'name': value[1]}
 
+    def value_parser(self):
+        if self.multi:
+            return self.parse_value
+
+        def parse(value):
+            if not value:
+                return None
+            value = value.split(';#', 1)
+            if len(value) != 2:
+                return self._parse(value)
+            return {'id': int(value[0]), 'name': value[1]}
+        return parse
+
     def _unparse(self, value):
         return [text_type(value['id']), value.get('name', '')]
     
@@ -0,0 +1,188 @@
+"""
+Records what each request made to a site cost: how long it took, how much
+was sent and received, and how it ended.
+
+SharePointSite calls its before_request hooks with a RequestRecord as each
+request is made, and its after_request hooks once the response has been read
+(or the request has failed). Its metrics attribute is a Metrics, which is
+one such hook, and which totals the records by operation.
+"""
+
+import bisect
+import collections
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+
+
+class RequestRecord(object):
+    """
+    What is known about a request.
+
+    operation is the SOAP method called, or another name given to the
+    request, such as 'download', or else the HTTP method. list_id is the
+    list the request was about, if any. latency is the time in seconds from
+    making the request to reading the end of the response. retries counts
+    the times it was sent again on a new connection. error is the repr() of
+    the exception the request failed with, if it did.
+
+    request is the Request itself, until the record is finished; it is then
+    dropped, so that kept records don't keep request bodies (or the files
+    they are streamed from) alive.
+    """
+
+    def __init__(self, request, operation=None, list_id=None):
+        self.request, self.url = request, request.get_full_url()
+        self.method, self.soapaction = request.get_method(), request.get_header('Soapaction')
+        self.operation = operation or getattr(request, 'operation', None) or self.method
+        self.list_id = list_id
+        self.request_bytes = len(request.data) if request.data is not None else 0
+        self.response_bytes = 0
+        self.status = self.error = self.latency = None
+        self.retries = 0
+        self.started = time.time()
+
+    def __repr__(self):
+        return '<RequestRecord {0} {1} {2:.3f}s>'.format(self.operation, self.status, self.latency or 0)
+
+
+class MeteredResponse(object):
+    """
+    Wraps a response, counting the bytes read from it, and calls finish()
+    when it has been read to the end or closed.
+    """
+
+    def __init__(self, response, record, finish):
+        self._response, self._record, self._finish = response, record, finish
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def _counted(self, data):
+        if self._record is not None:
+            self._record.response_bytes += len(data)
+            if not data:
+                self._done()
+        return data
+
+    def read(self, *args):
+        return self._counted(self._response.read(*args))
+
+    def readline(self, *args):
+        return self._counted(self._response.readline(*args))
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+    def _done(self):
+        record, self._record = self._record, None
+        if record is not None:
+            self._finish(record)
+
+    def close(self):
+        self._response.close()
+        self._done()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class OperationStats(object):
+    def __init__(self):
+        self.count = self.errors = self.retries = 0
+        self.request_bytes = self.response_bytes = 0
+        self.total_time, self.max_time = 0.0, 0.0
+        self.statuses = collections.Counter()
+        self.histogram = [0] * len(LATENCY_BUCKETS)
+
+    def add(self, record):
+        self.count += 1
+        self.errors += record.error is not None
+        self.retries += record.retries
+        self.request_bytes += record.request_bytes
+        self.response_bytes += record.response_bytes
+        self.total_time += record.latency
+        self.max_time = max(self.max_time, record.latency)
+        self.statuses[record.status] += 1
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS, record.latency)] += 1
+
+    def percentile(self, fraction):
+        """
+        Returns the upper bound of the histogram bucket holding the given
+        fraction of requests, which is at most max_time.
+        """
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.histogram):
+            seen += count
+            if seen >= fraction * self.count:
+                return min(bound, self.max_time)
+        return self.max_time
+
+    def as_dict(self):
+        return {'count': self.count,
+                'errors': self.errors,
+                'retries': self.retries,
+                'request_bytes': self.request_bytes,
+                'response_bytes': self.response_bytes,
+                'total_time': self.total_time,
+                'mean_time': self.total_time / self.count if self.count else 0.0,
+                'max_time': self.max_time,
+                'p50': self.percentile(0.5),
+                'p90': self.percentile(0.9),
+                'p99': self.percentile(0.99),
+                'statuses': dict(self.statuses),
+                'histogram': list(zip(LATENCY_BUCKETS, self.histogram))}
+
+
+class Metrics(object):
+    """
+    Totals RequestRecords by operation, and by list. Call it with each
+    finished record, or add it to a site's after_request hooks.
+
+    The last max_records records are kept in records.
+    """
+
+    def __init__(self, max_records=1000):
+        self.records = collections.deque(maxlen=max_records)
+        self._by_operation = collections.defaultdict(OperationStats)
+        self._by_list = collections.defaultdict(OperationStats)
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        with self._lock:
+            self.records.append(record)
+            self._by_operation[record.operation].add(record)
+            if record.list_id:
+                self._by_list[record.list_id].add(record)
+
+    def stats(self, by='operation'):
+        """
+        Returns a dict from each operation (or with by='list', each list ID)
+        to the count, errors, retries, bytes sent and received, latency
+        percentiles and latency histogram of its requests.
+        """
+        with self._lock:
+            stats = self._by_list if by == 'list' else self._by_operation
+            return dict((key, value.as_dict()) for key, value in stats.items())
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+            self._by_operation.clear()
+            self._by_list.clear()
+
+    def summary(self):
+        """
+        Returns a table of the stats for each operation, as text.
+        """
+        lines = ['{0:<32} {1:>7} {2:>6} {3:>7} {4:>9} {5:>9} {6:>9} {7:>12} {8:>12}'.format(
+            'operation', 'count', 'errors', 'retries', 'total s', 'p50 s', 'p99 s', 'sent', 'received')]
+        for operation, stats in sorted(self.stats().items()):
+            lines.append('{0:<32} {count:>7} {errors:>6} {retries:>7} {total_time:>9.3f} {p50:>9.3f} '
+                         '{p99:>9.3f} {request_bytes:>12} {response_bytes:>12}'.format(operation, **stats))
+        return '\n'.join(lines) + '\n'
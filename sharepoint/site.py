@@ -1,45 +1,134 @@
 import functools
+import time
 
 from lxml import etree
 
+from six.moves.urllib.error import HTTPError
 from six.moves.urllib.request import Request
 from six.moves.urllib.parse import urljoin
 
 from .lists import SharePointLists
-from .users import SharePointUsers
-from .xml import soap_body, namespaces, OUT
+from .lists.cache import ListSettingsCache
+from .metrics import Metrics, MeteredResponse, RequestRecord
+from .users import SharePointUsers, UserCaches
+from .xml import soap_body, namespaces, OUT, RowStream, StreamingSOAPBody
 
 
 class SharePointSite(object):
-    def __init__(self, url, opener, timeout=None):
+    def __init__(self, url, opener, timeout=None, max_workers=4, cache_dir=None,
+                 user_caches=None):
+        """
+        max_workers limits how many requests this site will make at once
+        when a single operation, such as fetching the rows of a list, needs
+        several of them.
+
+        If cache_dir is given, list settings and field definitions are cached
+        there between runs, and only fetched again when a list changes.
+
+        user_caches is a UserCaches, for looking up users. Pass the same one
+        to several sites (or use UserCaches.shared()) to share it.
+
+        Every request made through the opener is passed, as a RequestRecord,
+        to each function in before_request as it's made, and to each in
+        after_request once its response has been read. metrics, which
+        stats() reports on, is one of the latter.
+        """
         if not url.endswith('/'):
             url += '/'
 
         self.opener = opener
         self.opener.base_url = url
         self.opener.post_soap = self.post_soap
+        # Keep the opener's own open(), even if another site has wrapped it
+        self._open = getattr(opener, 'unmetered_open', opener.open)
+        self.opener.unmetered_open = self._open
+        self.opener.open = self.open
         self.opener.relative = functools.partial(urljoin, url)
+        self.opener.max_workers = max_workers
         self.timeout = timeout
+        self.settings_cache = ListSettingsCache(cache_dir) if cache_dir else None
+        self.user_caches = user_caches if user_caches is not None else UserCaches()
+        self.metrics = Metrics()
+        self.before_request, self.after_request = [], [self.metrics]
+
+    def open(self, url, data=None, *args, **kwargs):
+        """
+        Opens url (a URL or Request) with the opener, calling the request
+        hooks. This replaces the opener's open().
+        """
+        request = url if isinstance(url, Request) else Request(url)
+        if data is not None:
+            request.data = data
+        return self._request(RequestRecord(request), *args, **kwargs)
+
+    def _request(self, record, *args, **kwargs):
+        for hook in self.before_request:
+            hook(record)
+        try:
+            response = self._open(record.request, *args, **kwargs)
+        except HTTPError as e:
+            record.status, record.error = e.code, repr(e)
+            self._finish(record)
+            raise
+        except Exception as e:
+            record.error = repr(e)
+            self._finish(record)
+            raise
+        record.status = response.getcode()
+        return MeteredResponse(response, record, self._finish)
 
-    def post_soap(self, url, xml, soapaction=None):
+    def _finish(self, record):
+        record.latency = time.time() - record.started
+        record.retries = getattr(record.request, 'retries', 0)
+        try:
+            for hook in self.after_request:
+                hook(record)
+        finally:
+            record.request = None
+
+    def stats(self, by='operation'):
+        """
+        Returns the request stats from metrics, by operation or by list.
+        See Metrics.stats().
+        """
+        return self.metrics.stats(by)
+
+    def post_soap(self, url, xml, soapaction=None, stream=False):
+        """
+        Makes a SOAP request, returning the element in the response body.
+
+        If stream is True, returns a RowStream over the z:row elements in the
+        response instead, which parses them as they arrive.
+
+        xml can also be a StreamingSOAPBody, which is sent as it is read.
+        """
         url = self.opener.relative(url)
-        request = Request(url, etree.tostring(soap_body(xml)))
+        if isinstance(xml, StreamingSOAPBody):
+            request = Request(url, xml)
+            request.add_header('Content-length', str(len(xml)))
+            xml = xml.xml
+        else:
+            request = Request(url, etree.tostring(soap_body(xml)))
         request.add_header('Content-type', 'text/xml; charset=utf-8')
         if soapaction:
             request.add_header('Soapaction', soapaction)
-        response = self.opener.open(request, timeout=self.timeout)
+        record = RequestRecord(request, etree.QName(xml).localname,
+                               xml.findtext('sp:listName', namespaces=namespaces))
+        response = self._request(record, timeout=self.timeout)
+        if stream:
+            return RowStream(response)
         return etree.parse(response).xpath('/soap:Envelope/soap:Body/*', namespaces=namespaces)[0]
 
     @property
     def lists(self):
         if not hasattr(self, '_lists'):
-            self._lists = SharePointLists(self.opener)
+            self._lists = SharePointLists(self.opener, self.settings_cache)
         return self._lists
 
     @property
     def users(self):
         if not hasattr(self, '_users'):
-            self._users = SharePointUsers(self.opener)
+            self._users = SharePointUsers(self.opener, self.user_caches)
         return self._users
 
     def as_xml(self, include_lists=False, include_users=False, **kwargs):
@@ -51,3 +140,17 @@ class SharePointSite(object):
                 kwargs['user_ids'] = set(xml.xpath('.//sharepoint:user/@id', namespaces=namespaces))
             xml.append(self.users.as_xml(**kwargs))
         return xml
+
+    def write_xml(self, writer, include_lists=False, include_users=False, **kwargs):
+        """
+        Like as_xml(), but writes to an XMLWriter as lists and users are
+        fetched, rather than building the whole tree first.
+        """
+        with writer.element(OUT.site(url=self.opener.base_url)):
+            referenced_users = set()
+            if include_lists or kwargs.get('list_names') or kwargs.get('lists'):
+                self.lists.write_xml(writer, referenced_users=referenced_users, **kwargs)
+            if include_users:
+                if 'user_ids' not in kwargs:
+                    kwargs['user_ids'] = referenced_users
+                self.users.write_xml(writer, **kwargs)
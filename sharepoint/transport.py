@@ -0,0 +1,180 @@
+"""
+A urllib handler that keeps HTTP/1.1 connections open between requests.
+
+urllib's own handlers open a new connection (and for HTTPS, do a new TLS
+handshake) for every request. KeepAliveHandler instead takes connections from
+a ConnectionPool and returns them once a response has been read to the end,
+so that they can be reused by later requests to the same host.
+
+It relies on the internals of http.client from Python 3.6 on. On older
+versions, KEEP_ALIVE_SUPPORTED is False and urllib's own handlers should be
+used instead.
+"""
+
+import collections
+import functools
+import sys
+import threading
+import time
+
+from six.moves import http_client
+from six.moves.urllib.error import URLError
+from six.moves.urllib.request import HTTPHandler, HTTPSHandler
+
+KEEP_ALIVE_SUPPORTED = sys.version_info >= (3, 6)
+
+
+class PooledHTTPResponse(http_client.HTTPResponse):
+    """
+    A response that hands its connection back once the body has been read.
+    """
+    _release_conn = None
+
+    def close(self):
+        if self.fp:
+            # The body hasn't been read to the end, so whatever is left of it
+            # is still waiting on the connection. It can't be reused.
+            self._reusable = False
+        super(PooledHTTPResponse, self).close()
+
+    def _close_conn(self):
+        super(PooledHTTPResponse, self)._close_conn()
+        release_conn, self._release_conn = self._release_conn, None
+        if release_conn:
+            release_conn(getattr(self, '_reusable', True) and not self.will_close)
+
+
+class ConnectionPool(object):
+    """
+    A thread-safe store of idle connections, kept per host.
+
+    At most max_size idle connections are kept for each host; any more are
+    closed when they are released. Connections left idle for longer than
+    idle_timeout seconds are closed rather than reused.
+    """
+
+    def __init__(self, max_size=10, idle_timeout=30):
+        self.max_size, self.idle_timeout = max_size, idle_timeout
+        self._idle = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns an idle connection for key, or None if there isn't one.
+        """
+        with self._lock:
+            idle = self._idle[key]
+            while idle:
+                connection, released = idle.pop()
+                if time.time() - released < self.idle_timeout:
+                    return connection
+                connection.close()
+        return None
+
+    def put(self, key, connection):
+        with self._lock:
+            idle = self._idle[key]
+            if len(idle) < self.max_size:
+                idle.append((connection, time.time()))
+                return
+        connection.close()
+
+    def clear(self):
+        """
+        Closes all idle connections.
+        """
+        with self._lock:
+            for idle in self._idle.values():
+                for connection, released in idle:
+                    connection.close()
+            self._idle.clear()
+
+
+class KeepAliveHandler(HTTPHandler, HTTPSHandler):
+    """
+    Handles http and https URLs using persistent connections from a pool.
+
+    Pass this to build_opener() in place of urllib's own HTTP handlers.
+    """
+
+    def __init__(self, pool=None, context=None, debuglevel=0):
+        if not KEEP_ALIVE_SUPPORTED:
+            raise RuntimeError("KeepAliveHandler needs Python 3.6 or later")
+        HTTPSHandler.__init__(self, debuglevel=debuglevel, context=context)
+        self.pool = pool if pool is not None else ConnectionPool()
+
+    def http_open(self, req):
+        return self.do_open(http_client.HTTPConnection, req)
+
+    def https_open(self, req):
+        return self.do_open(http_client.HTTPSConnection, req, context=self._context)
+
+    def do_open(self, http_class, req, **http_conn_args):
+        host = req.host
+        if not host:
+            raise URLError('no host given')
+        if req._tunnel_host:
+            # Leave connections through proxies to urllib
+            return super(KeepAliveHandler, self).do_open(http_class, req, **http_conn_args)
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update((k, v) for k, v in req.headers.items() if k not in headers)
+        headers = dict((name.title(), value) for name, value in headers.items())
+        headers.pop('Connection', None)
+
+        key = (http_class, host, req.timeout)
+        while True:
+            connection = self.pool.get(key)
+            reused = connection is not None
+            if connection is None:
+                connection = http_class(host, timeout=req.timeout, **http_conn_args)
+                connection.response_class = PooledHTTPResponse
+                connection.set_debuglevel(self._debuglevel)
+            try:
+                connection.request(req.get_method(), req.selector, req.data, headers,
+                                   encode_chunked=req.has_header('Transfer-encoding'))
+                response = connection.getresponse()
+            except (http_client.BadStatusLine, ConnectionError) as e:
+                connection.close()
+                # The server may have closed an idle connection while it was
+                # in the pool, so try again with a new one.
+                if reused and self._rewind(req.data):
+                    req.retries = getattr(req, 'retries', 0) + 1
+                    continue
+                raise URLError(e)
+            except OSError as e:
+                connection.close()
+                raise URLError(e)
+            except:
+                connection.close()
+                raise
+            break
+
+        response.url = req.get_full_url()
+        response.msg = response.reason
+        release_conn = functools.partial(self._release_conn, key, connection)
+        if response.fp is None:
+            # There was no body to read
+            release_conn(not response.will_close)
+        else:
+            response._release_conn = release_conn
+        return response
+
+    def _rewind(self, data):
+        """
+        Makes a request body ready to be sent again, returning False if it
+        can't be.
+        """
+        if data is None or isinstance(data, bytes):
+            return True
+        try:
+            data.seek(0)
+        except (AttributeError, OSError, ValueError):
+            return False
+        return True
+
+    def _release_conn(self, key, connection, reusable):
+        if reusable and connection.sock is not None:
+            self.pool.put(key, connection)
+        else:
+            connection.close()
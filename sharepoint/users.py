@@ -1,56 +1,166 @@
+import threading
+
 from lxml import etree
 from lxml.builder import E
 
 from six import text_type
 from six.moves.urllib.error import HTTPError
-from six.moves.urllib.parse import urlparse, parse_qs
+from six.moves.urllib.parse import urlparse, parse_qs, quote
+from six.moves.urllib.request import Request
 
+from .cache import Cache, missing
+from .utils import concurrent_map
 from .xml import namespaces, OUT, SP, SEARCH, SQ
 
 USER_PATH = '_vti_bin/ListData.svc/UserInformationList({0})'
+USER_FILTER_PATH = '_vti_bin/ListData.svc/UserInformationList?$filter={0}'
 
 PEOPLE_WEBSERVICE = '_vti_bin/People.asmx'
 SEARCH_WEBSERVICE = '_vti_bin/search.asmx'
 
 
+class UserCaches(object):
+    """
+    The caches used by SharePointUsers: of users by ID, of users by account
+    name, and of search results.
+
+    Each holds at most max_size entries for ttl seconds. Users that were
+    looked up but don't exist are remembered for negative_ttl seconds.
+
+    To share caches between SharePointSite objects for the same site, pass
+    them UserCaches.shared(url).
+    """
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_size=10000, ttl=3600, negative_ttl=300):
+        self.users = Cache(max_size, ttl, negative_ttl)
+        self.principals = Cache(max_size, ttl, negative_ttl)
+        self.searches = Cache(max_size, ttl, negative_ttl)
+
+    @classmethod
+    def shared(cls, url, **kwargs):
+        """
+        Returns the caches for the site at url, creating them with kwargs if
+        there aren't any yet.
+        """
+        if not url.endswith('/'):
+            url += '/'
+        with cls._shared_lock:
+            if url not in cls._shared:
+                cls._shared[url] = cls(**kwargs)
+            return cls._shared[url]
+
+    def stats(self):
+        return {'users': self.users.stats(),
+                'principals': self.principals.stats(),
+                'searches': self.searches.stats()}
+
+
 class SharePointUsers(object):
-    def __init__(self, opener):
+    def __init__(self, opener, caches=None):
         self.opener = opener
-        self._users = {}
-        self._user_searches = {}
-        self._resolved_principals = {}
+        self.caches = caches if caches is not None else UserCaches()
+        self._users = self.caches.users
+        self._user_searches = self.caches.searches
+        self._resolved_principals = self.caches.principals
     
     def __getitem__(self, key):
         key = int(key)
-        if key not in self._users:
-            url = self.opener.base_url + USER_PATH.format(key)
-            try:
-                data = self.opener.open(url)
-            except HTTPError as e:
-                if e.code == 404:
-                    self._users[key] = None
-                else:
-                    raise
-            else:
-                props = etree.parse(data).xpath('.//m:properties/*',
-                                                namespaces=namespaces)
-                self._users[key] = SharePointUser(key, props)
-        if self._users[key] is None:
+        user = self._users.get(key, missing)
+        if user is missing:
+            user = self._users[key] = self._fetch_user(key)
+        if user is None:
             raise KeyError(key)
-        return self._users[key]
+        return user
+
+    def _fetch_user(self, key):
+        request = Request(self.opener.base_url + USER_PATH.format(key))
+        request.operation = 'GetUser'
+        try:
+            data = self.opener.open(request)
+        except HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+        props = etree.parse(data).xpath('.//m:properties/*',
+                                        namespaces=namespaces)
+        return SharePointUser(key, props)
+
+    def _fetch_users(self, keys):
+        """
+        Fetches several users with one request, returning a dict with None
+        for those that don't exist.
+        """
+        query = ' or '.join('Id eq {0}'.format(key) for key in keys)
+        url = self.opener.base_url + USER_FILTER_PATH.format(quote(query))
+        request = Request(url)
+        request.operation = 'GetUsers'
+        users = dict.fromkeys(keys)
+        for properties in etree.parse(self.opener.open(request)).xpath('.//m:properties',
+                                                                      namespaces=namespaces):
+            id_element = properties.find('d:Id', namespaces=namespaces)
+            if id_element is None:
+                raise ValueError("User without an Id in {0}".format(url))
+            key = int(id_element.text)
+            users[key] = SharePointUser(key, list(properties))
+        return users
+
+    def _fetch_many(self, keys, batch_size=50):
+        """
+        Fetches and caches the users with the given IDs, returning a dict
+        with None for those that don't exist.
+        """
+        keys = sorted(keys)
+        max_workers = getattr(self.opener, 'max_workers', 1)
+        batches = [keys[i:i+batch_size] for i in range(0, len(keys), batch_size)]
+        fetched = {}
+        try:
+            for users in concurrent_map(self._fetch_users, batches, max_workers):
+                fetched.update(users)
+        except (HTTPError, ValueError):
+            keys = [key for key in keys if key not in fetched]
+            fetched.update(zip(keys, concurrent_map(self._fetch_user, keys, max_workers)))
+        self._users.update(fetched)
+        return fetched
+
+    def prefetch(self, keys, batch_size=50):
+        """
+        Fetches the users with the given IDs that aren't already cached.
+
+        Users are fetched batch_size at a time using a $filter query. If
+        that's not supported, they're fetched one at a time instead, several
+        at once.
+        """
+        self._fetch_many([key for key in set(int(key) for key in keys) if key not in self._users],
+                         batch_size)
+
+    def get_many(self, keys):
+        """
+        Returns a dict of the users with the given IDs, leaving out those
+        that don't exist. See prefetch().
+        """
+        users = dict((key, self._users.get(key, missing)) for key in set(int(key) for key in keys))
+        users.update(self._fetch_many([key for key, user in users.items() if user is missing]))
+        return dict((key, user) for key, user in users.items() if user is not None)
 
     def resolve_principal(self, principal):
         return self.resolve_principals([principal])[0]
 
     def resolve_principals(self, principals):
-        principals_to_resolve = set(p for p in principals if p not in self._resolved_principals)
+        resolved = dict((p, self._resolved_principals.get(p)) for p in principals)
+        principals_to_resolve = set(p for p, user in resolved.items() if user is None)
 
         if principals_to_resolve:
             xml = SP.ResolvePrincipals(SP.principalKeys(*(SP.string(p) for p in principals_to_resolve)))
             xml.append(SP.principalType('All'))
             result = self.opener.post_soap(PEOPLE_WEBSERVICE, xml)
 
-            for principal_info in result.xpath('*/sp:PrincipalInfo', namespaces=namespaces):
+            principal_infos = result.xpath('*/sp:PrincipalInfo', namespaces=namespaces)
+            user_ids = [int(principal_info.find('sp:UserInfoID', namespaces=namespaces).text)
+                        for principal_info in principal_infos]
+            self.prefetch(user_id for user_id in user_ids if user_id != -1)
+            for principal_info in principal_infos:
                 user_id = int(principal_info.find('sp:UserInfoID', namespaces=namespaces).text)
                 account_name = principal_info.find('sp:AccountName', namespaces=namespaces).text
                 display_name = principal_info.find('sp:DisplayName', namespaces=namespaces)
@@ -58,13 +168,14 @@ class SharePointUsers(object):
                 if user_id == -1:
                     raise ValueError("User {0} ({1}) not yet in SharePoint.".format(account_name,
                                                                                     display_name))
-                self._resolved_principals[account_name] = self[user_id]
+                resolved[account_name] = self._resolved_principals[account_name] = self[user_id]
 
-        return [self._resolved_principals.get(p) for p in principals]
+        return [resolved.get(p) for p in principals]
 
     def search(self, name, max_results=None):
-        if name in self._user_searches:
-            return self._user_searches[name]
+        users = self._user_searches.get(name)
+        if users is not None:
+            return users
         query = SQ.QueryPacket(
             E.Query(
                 E.Context(
@@ -88,11 +199,21 @@ class SharePointUsers(object):
         return users
 
     def as_xml(self, user_ids, **kwargs):
+        self.prefetch(user_ids)
         xml = OUT.users()
         for user_id in user_ids:
             xml.append(self[user_id].as_xml())
         return xml
 
+    def write_xml(self, writer, user_ids, **kwargs):
+        """
+        Like as_xml(), but writes to an XMLWriter, a user at a time.
+        """
+        self.prefetch(user_ids)
+        with writer.element(OUT.users()):
+            for user_id in user_ids:
+                writer.write(self[user_id].as_xml())
+
 
 class SharePointUser(object):
     def __init__(self, id, props):
@@ -1,4 +1,6 @@
+import collections
 import re
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 
 from six import unichr
 
@@ -34,3 +36,64 @@ def decode_entities(text):
                 pass
         return text  # leave as is
     return re.sub("&#?\w+;", fixup, text)
+
+
+def concurrent_map(func, iterable, max_workers=1):
+    """
+    Like map(), but calls func from up to max_workers threads at once.
+
+    Returns a list of the results in the same order as iterable. With
+    max_workers of one or less, everything happens in the calling thread.
+    """
+    items = list(iterable)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def concurrent_imap(func, iterable, max_workers=1):
+    """
+    Like concurrent_map(), but yields each result as soon as it and those
+    before it are ready, rather than waiting for them all.
+
+    Items are only taken from iterable as results are yielded, so that at
+    most max_workers results are running or waiting to be yielded at once,
+    rather than piling up behind a slow one.
+    """
+    if max_workers <= 1:
+        for item in iterable:
+            yield func(item)
+        return
+    with ThreadPoolExecutor(max_workers) as executor:
+        pending = collections.deque()
+        for item in iterable:
+            if len(pending) >= max_workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(func, item))
+        while pending:
+            yield pending.popleft().result()
+
+
+def concurrent_imap_unordered(func, iterable, max_workers=1):
+    """
+    Yields (item, func(item)) pairs as each call to func completes, with up to
+    max_workers calls running at once.
+
+    Items are only taken from iterable as workers become free, so it can be
+    a generator that builds them lazily.
+    """
+    if max_workers <= 1:
+        for item in iterable:
+            yield item, func(item)
+        return
+    with ThreadPoolExecutor(max_workers) as executor:
+        pending = {}
+        for item in iterable:
+            if len(pending) >= max_workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+            pending[executor.submit(func, item)] = item
+        for future in as_completed(pending):
+            yield pending[future], future.result()
@@ -1,4 +1,9 @@
-from lxml import builder
+import base64
+import contextlib
+import io
+import os
+
+from lxml import builder, etree
 
 namespaces = {
     'xs': 'http://www.w3.org/2001/XMLSchema',
@@ -33,3 +38,214 @@ SQ = builder.ElementMaker(namespace=namespaces['sq'], nsmap={None: namespaces['s
 
 def soap_body(*args, **kwargs):
     return SOAP.Envelope(SOAP.Body(*args, **kwargs))
+
+
+class RowStream(object):
+    """
+    Iterates over the z:row elements in a SOAP response as they are parsed.
+
+    Each row is cleared and dropped from the tree once the next is asked for,
+    so only one is held in memory at a time. The attributes of the enclosing
+    rs:data element (such as ListItemCollectionPositionNext) are available as
+    data_attrib once it has been parsed.
+    """
+    data_tag = '{{{0}}}data'.format(namespaces['rs'])
+    row_tag = '{{{0}}}row'.format(namespaces['z'])
+
+    def __init__(self, response):
+        self.response = response
+        self.data_attrib = {}
+
+    def __iter__(self):
+        try:
+            for event, element in etree.iterparse(self.response, events=('start', 'end')):
+                if event == 'start':
+                    if element.tag == self.data_tag:
+                        self.data_attrib = dict(element.attrib)
+                elif element.tag == self.row_tag:
+                    yield element
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+            # Read anything left so the connection can be reused.
+            self.response.read()
+        finally:
+            self.response.close()
+
+
+class StreamingSOAPBody(object):
+    """
+    A SOAP request body in which the text of one element is the base64
+    encoding of a file, which is read and encoded a chunk at a time as the
+    body is read, rather than all at once.
+
+    element is the (empty) element of xml to put the encoded file in, and
+    fileobj is read from its current position to the end. Pass this to
+    post_soap() in place of xml.
+    """
+    # A multiple of three, so that each chunk encodes without padding
+    chunk_size = 48 * 1024
+
+    def __init__(self, xml, element, fileobj):
+        marker = etree.Comment('streaming-soap-body-marker')
+        element.append(marker)
+        try:
+            text = etree.tostring(soap_body(xml))
+        finally:
+            element.remove(marker)
+        self._prefix, self._suffix = text.split(etree.tostring(marker))
+        self.xml = xml
+        self.fileobj, self._start = fileobj, fileobj.tell()
+        try:
+            size = os.fstat(fileobj.fileno()).st_size - self._start
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            fileobj.seek(0, io.SEEK_END)
+            size = fileobj.tell() - self._start
+            fileobj.seek(self._start)
+        self.length = len(self._prefix) + (size + 2) // 3 * 4 + len(self._suffix)
+        self.seek(0)
+
+    def __len__(self):
+        return self.length
+
+    def _parts(self):
+        yield self._prefix
+        pending = b''
+        while True:
+            data = self.fileobj.read(self.chunk_size)
+            if not data:
+                break
+            pending += data
+            whole = len(pending) - len(pending) % 3
+            yield base64.b64encode(pending[:whole])
+            pending = pending[whole:]
+        yield base64.b64encode(pending) + self._suffix
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._pending_parts)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """
+        Goes back to the start of the body, so that it can be sent again.
+        Only seek(0) is supported.
+        """
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("can only seek to the start")
+        self.fileobj.seek(self._start)
+        self._pending_parts, self._buffer = self._parts(), b''
+        return 0
+
+
+class XMLWriter(object):
+    """
+    Writes an XML document to a file an element at a time.
+
+    Open a container element with element(), then write complete elements
+    into the innermost open container with write(). The bytes written are
+    exactly those etree.tostring() would produce for the whole tree, but only
+    the open containers are held in memory.
+    """
+
+    class _Container(object):
+        def __init__(self, element, parent_lead):
+            self.element, self.parent_lead = element, parent_lead
+            self.started = False
+
+    def __init__(self, out, pretty_print=False):
+        self.out, self.pretty_print = out, pretty_print
+        self._stack = []
+        self._marker = etree.tostring(etree.Comment('xml-writer-marker'))
+        # Written after the root element
+        self._tail = b'\n' if pretty_print else b''
+
+    def _serialize(self):
+        return etree.tostring(self._root, pretty_print=self.pretty_print)
+
+    def _bounds(self):
+        """
+        Returns the lengths of the text before and after the content of the
+        innermost container.
+        """
+        if not self._stack:
+            return 0, len(self._tail)
+        container = self._stack[-1]
+        return container.prefix_len, container.suffix_len
+
+    def _start(self):
+        # Containers aren't written until their first child, as they're
+        # self-closing if they don't have any.
+        for container in self._stack:
+            if not container.started:
+                self.out.write(container.parent_lead + container.open_text)
+                container.started = True
+
+    def _write_in_place(self, element):
+        """
+        Writes element as it would appear in the innermost container, which
+        it must already have been appended to.
+        """
+        prefix_len, suffix_len = self._bounds()
+        text = self._serialize()
+        self._start()
+        self.out.write((self._stack[-1].lead if self._stack else b'') +
+                       text[prefix_len:len(text) - suffix_len])
+
+    def write(self, element):
+        """
+        Writes a complete element into the innermost open container.
+        """
+        parent = self._stack[-1].element
+        parent.append(element)
+        try:
+            self._write_in_place(element)
+        finally:
+            parent.remove(element)
+
+    @contextlib.contextmanager
+    def element(self, element):
+        """
+        Opens element, which should have no children, as a container. It is
+        closed when the context exits.
+        """
+        parent_prefix_len, parent_suffix_len = self._bounds()
+        if self._stack:
+            parent_lead = self._stack[-1].lead
+            self._stack[-1].element.append(element)
+        else:
+            parent_lead = b''
+            self._root = element
+
+        element.append(etree.Comment('xml-writer-marker'))
+        text = self._serialize()
+        element.remove(element[-1])
+        marker_pos = text.index(self._marker)
+
+        container = self._Container(element, parent_lead)
+        head = text[parent_prefix_len:marker_pos]
+        container.open_text = head.rstrip()
+        container.lead = head[len(container.open_text):]
+        container.close_text = text[marker_pos + len(self._marker):len(text) - parent_suffix_len]
+        container.prefix_len = marker_pos
+        container.suffix_len = len(text) - marker_pos - len(self._marker)
+        self._stack.append(container)
+
+        yield element
+
+        self._stack.pop()
+        if container.started:
+            self.out.write(container.close_text)
+        else:
+            self._write_in_place(element)
+        if self._stack:
+            self._stack[-1].element.remove(element)
+        else:
+            self.out.write(self._tail)
+            del self._root
@@ -0,0 +1,184 @@
+"""
+A stand-in for a SharePoint site, for tests that go through SharePointSite.
+"""
+
+import io
+import threading
+import time
+
+from lxml import etree
+from lxml.builder import ElementMaker
+
+from sharepoint.xml import SP, namespaces, soap_body
+
+RS = ElementMaker(namespace=namespaces['rs'], nsmap=namespaces)
+Z = ElementMaker(namespace=namespaces['z'], nsmap=namespaces)
+
+USER_INFO_ID = '{99999999-0000-0000-0000-000000000000}'
+
+
+class Response(io.BytesIO):
+    def getcode(self):
+        return 200
+
+
+class FakeOpener(object):
+    """
+    Answers SOAP requests made through it with the method named after the
+    request, which returns the element to put in the response body.
+
+    lists maps each list's title to its fields, as (name, type) pairs, and
+    rows maps each title to a dict of its rows, by ID, each a dict of raw
+    field values by name. calls holds the name of each request made. Each
+    request takes delay seconds to answer.
+    """
+
+    def __init__(self, lists=None, rows=None, delay=0):
+        self.lists = lists or {}
+        self.rows = rows or {}
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def open(self, request, timeout=None):
+        xml = etree.fromstring(request.data).xpath('/soap:Envelope/soap:Body/*', namespaces=namespaces)[0]
+        name = etree.QName(xml).localname
+        with self._lock:
+            self.calls.append(name)
+        time.sleep(self.delay)
+        return Response(etree.tostring(soap_body(getattr(self, name)(xml))))
+
+    def list_id(self, title):
+        return '{{{0:08d}-0000-0000-0000-000000000000}}'.format(sorted(self.lists).index(title) + 1)
+
+    def list_title(self, list_name):
+        for title in self.lists:
+            if list_name in (title, self.list_id(title)):
+                return title
+        raise KeyError(list_name)
+
+    def list_element(self, title, fields=True):
+        element = SP.List(ID=self.list_id(title), Title=title, Version='1',
+                          Modified='2020-01-01 00:00:00', EnableModeration='False')
+        if fields:
+            # Lookups are to the list itself
+            element.append(SP.Fields(*(SP.Field(Name=name, DisplayName=name, Type=type, List=self.list_id(title))
+                                       for name, type in self.lists[title])))
+        return element
+
+    def GetListCollection(self, xml):
+        return SP.GetListCollectionResponse(SP.GetListCollectionResult(
+            SP.Lists(*(self.list_element(title, fields=False) for title in sorted(self.lists)))))
+
+    def GetList(self, xml):
+        list_name = xml.findtext('sp:listName', namespaces=namespaces)
+        if list_name == 'UserInfo':
+            element = SP.List(SP.Fields(SP.Field(Name='ID', DisplayName='ID', Type='Counter')),
+                              ID=USER_INFO_ID, Title='User Information List')
+        else:
+            element = self.list_element(self.list_title(list_name))
+        return SP.GetListResponse(SP.GetListResult(element))
+
+    def row_element(self, title, row_id, field_names):
+        return Z.row(**dict(('ows_' + name, value) for name, value in self.rows[title][row_id].items()
+                            if name in field_names or name == 'ID'))
+
+    def selected_ids(self, title, xml):
+        """
+        Returns the IDs of the rows picked out by the In query in xml, if
+        there is one, or else all of them.
+        """
+        values = xml.xpath('sp:query//In[FieldRef/@Name="ID"]/Values/Value/text()', namespaces=namespaces)
+        if values:
+            return sorted(set(map(int, values)) & set(self.rows[title]))
+        return sorted(self.rows[title])
+
+    def GetListItems(self, xml):
+        title = self.list_title(xml.findtext('sp:listName', namespaces=namespaces))
+        page_size = int(xml.findtext('sp:rowLimit', namespaces=namespaces))
+        field_names = set(xml.xpath('.//ViewFields/FieldRef/@Name'))
+        start = int((xml.xpath('.//Paging/@ListItemCollectionPositionNext') or ['p_ID=0'])[0].split('p_ID=')[1])
+        ids = [row_id for row_id in self.selected_ids(title, xml) if row_id > start]
+        data = RS.data(*(self.row_element(title, row_id, field_names) for row_id in ids[:page_size]),
+                       ItemCount=str(min(len(ids), page_size)))
+        if len(ids) > page_size:
+            data.set('ListItemCollectionPositionNext', 'Paged=TRUE&p_ID={0}'.format(ids[page_size - 1]))
+        return SP.GetListItemsResponse(SP.GetListItemsResult(SP.listitems(data)))
+
+    def UpdateListItems(self, xml):
+        """
+        Applies each change, except those that set a field to 'fail', which
+        fail. Text is stored stripped of surrounding space, so that rows only
+        get their new values by being updated from the response.
+        """
+        title = self.list_title(xml.findtext('sp:listName', namespaces=namespaces))
+        results = SP.Results()
+        for method in xml.iter('Method'):
+            values = dict((field.get('Name'), (field.text or '').strip()) for field in method.iter('Field'))
+            cmd, result_id = method.get('Cmd'), '{0},{1}'.format(method.get('ID'), method.get('Cmd'))
+            if 'fail' in values.values():
+                results.append(SP.Result(SP.ErrorCode('0x81020014'), SP.ErrorText('Invalid value'), ID=result_id))
+                continue
+            with self._lock:
+                if cmd == 'New':
+                    row_id = max(self.rows[title] or [0]) + 1
+                    values['ID'] = str(row_id)
+                    self.rows[title][row_id] = {}
+                row_id = int(values['ID'])
+                if cmd == 'Delete':
+                    del self.rows[title][row_id]
+                else:
+                    self.rows[title][row_id].update(values)
+            result = SP.Result(SP.ErrorCode('0x00000000'), ID=result_id)
+            if cmd != 'Delete':
+                result.append(self.row_element(title, row_id, self.rows[title][row_id]))
+            results.append(result)
+        return SP.UpdateListItemsResponse(SP.UpdateListItemsResult(results))
+
+
+class ChangesOpener(FakeOpener):
+    """
+    Also answers GetListItemChangesSinceToken, from a log of the changes
+    made with change(). Tokens are positions in the log, and those before
+    expired_before have expired.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(ChangesOpener, self).__init__(*args, **kwargs)
+        self.log, self.expired_before = [], 0
+
+    def change(self, title, row_id, change_type='Update', **values):
+        if change_type in ('Delete', 'MoveAway'):
+            self.rows[title].pop(row_id)
+        elif values:
+            self.rows[title].setdefault(row_id, {'ID': str(row_id)}).update(values)
+        self.log.append((row_id, change_type))
+
+    def GetListItemChangesSinceToken(self, xml):
+        title = self.list_title(xml.findtext('sp:listName', namespaces=namespaces))
+        page_size = int(xml.findtext('sp:rowLimit', namespaces=namespaces))
+        field_names = set(xml.xpath('.//ViewFields/FieldRef/@Name'))
+        token = xml.findtext('sp:changeToken', namespaces=namespaces)
+        changes, data = SP.Changes(), RS.data()
+        if token is None:
+            # The current token, and the first rows
+            for row_id in sorted(self.rows[title])[:page_size]:
+                data.append(self.row_element(title, row_id, field_names))
+            end = len(self.log)
+        elif int(token) < self.expired_before:
+            changes.append(SP.Id('', ChangeType='InvalidToken'))
+            end = int(token)
+        else:
+            start = int(token)
+            end = min(start + page_size, len(self.log))
+            for row_id, change_type in self.log[start:end]:
+                if change_type == 'Update':
+                    if row_id in self.rows[title]:
+                        data.append(self.row_element(title, row_id, field_names))
+                else:
+                    changes.append(SP.Id(str(row_id), ChangeType=change_type))
+            if end < len(self.log):
+                changes.set('MoreChanges', 'TRUE')
+        changes.set('LastChangeToken', str(end))
+        return SP.GetListItemChangesSinceTokenResponse(SP.GetListItemChangesSinceTokenResult(
+            SP.listitems(changes, data)))
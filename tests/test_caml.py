@@ -0,0 +1,113 @@
+import datetime
+import unittest
+
+from lxml import etree
+
+from sharepoint.lists import moderation
+from sharepoint.lists.caml import (And, BeginsWith, Contains, Eq, Geq, Gt, In, IsNotNull, IsNull, Leq, Lt,
+                                   Neq, Or, query_xml)
+from sharepoint.lists.types import type_mapping
+from sharepoint.site import SharePointSite
+from sharepoint.users import SharePointUser
+from sharepoint.xml import SP
+
+from .fakes import FakeOpener
+
+FIELDS = [('ID', 'Counter'), ('Title', 'Text'), ('Due_x0020_Date', 'DateTime'), ('Done', 'Boolean'),
+          ('Project', 'Lookup'), ('Owner', 'User'), ('_ModerationStatus', 'ModStat')]
+
+
+class CAMLTestCase(unittest.TestCase):
+    def setUp(self):
+        self.fields = {}
+        for name, type in FIELDS:
+            xml = SP.Field(Name=name, DisplayName=name, Type=type, List='{projects}')
+            self.fields[name] = type_mapping[type](None, '{tasks}', xml)
+
+    def assertCAML(self, condition, expected):
+        self.assertEqual(etree.tostring(condition.as_xml(self.fields)).decode('utf-8'), expected)
+
+    def test_comparisons(self):
+        for condition_class in (Eq, Neq, Lt, Leq, Gt, Geq, Contains, BeginsWith):
+            tag = condition_class.__name__
+            self.assertCAML(condition_class('Title', 'Report'),
+                            '<{0}><FieldRef Name="Title"/><Value Type="Text">Report</Value></{0}>'.format(tag))
+
+    def test_values_escaped(self):
+        self.assertCAML(Eq('Title', u'A & B <"\u2603">'),
+                        u'<Eq><FieldRef Name="Title"/><Value Type="Text">A &amp; B &lt;"\u2603"&gt;</Value></Eq>'
+                        .encode('ascii', 'xmlcharrefreplace').decode('ascii'))
+
+    def test_typed_values(self):
+        self.assertCAML(Gt('Due_x0020_Date', datetime.datetime(2020, 1, 2, 3, 4, 5)),
+                        '<Gt><FieldRef Name="Due_x0020_Date"/>'
+                        '<Value Type="DateTime" IncludeTimeValue="TRUE">2020-01-02T03:04:05</Value></Gt>')
+        self.assertCAML(Lt('Due_x0020_Date', datetime.date(2020, 1, 2)),
+                        '<Lt><FieldRef Name="Due_x0020_Date"/><Value Type="DateTime">2020-01-02</Value></Lt>')
+        self.assertCAML(Eq('Done', True),
+                        '<Eq><FieldRef Name="Done"/><Value Type="Boolean">1</Value></Eq>')
+        self.assertCAML(Eq('ID', 5),
+                        '<Eq><FieldRef Name="ID"/><Value Type="Counter">5</Value></Eq>')
+        self.assertCAML(Eq('_ModerationStatus', moderation.PENDING),
+                        '<Eq><FieldRef Name="_ModerationStatus"/><Value Type="ModStat">2</Value></Eq>')
+
+    def test_lookups_by_id_or_title(self):
+        self.assertCAML(Eq('Project', 3),
+                        '<Eq><FieldRef Name="Project" LookupId="TRUE"/><Value Type="Integer">3</Value></Eq>')
+        self.assertCAML(Eq('Project', 'Website'),
+                        '<Eq><FieldRef Name="Project"/><Value Type="Lookup">Website</Value></Eq>')
+        self.assertCAML(Eq('Owner', SharePointUser(7, [])),
+                        '<Eq><FieldRef Name="Owner" LookupId="TRUE"/><Value Type="Integer">7</Value></Eq>')
+        self.assertCAML(Eq('Owner', 'Jane'),
+                        '<Eq><FieldRef Name="Owner"/><Value Type="User">Jane</Value></Eq>')
+
+    def test_lookup_by_row(self):
+        opener = FakeOpener(lists={'Projects': [('ID', 'Counter'), ('Title', 'Text')]},
+                            rows={'Projects': {4: {'ID': '4', 'Title': 'Website'}}})
+        row = SharePointSite('http://example.org/', opener).lists['Projects'].rows[0]
+        self.assertCAML(Eq('Project', row),
+                        '<Eq><FieldRef Name="Project" LookupId="TRUE"/><Value Type="Integer">4</Value></Eq>')
+
+    def test_in(self):
+        self.assertCAML(In('ID', [1, 2]),
+                        '<In><FieldRef Name="ID"/><Values>'
+                        '<Value Type="Counter">1</Value><Value Type="Counter">2</Value></Values></In>')
+        self.assertCAML(In('Project', [1, 2]),
+                        '<In><FieldRef Name="Project" LookupId="TRUE"/><Values>'
+                        '<Value Type="Integer">1</Value><Value Type="Integer">2</Value></Values></In>')
+
+    def test_null(self):
+        self.assertCAML(IsNull('Owner'), '<IsNull><FieldRef Name="Owner"/></IsNull>')
+        self.assertCAML(IsNotNull('Owner'), '<IsNotNull><FieldRef Name="Owner"/></IsNotNull>')
+
+    def test_and_or_nested_in_pairs(self):
+        title, done, owner = Eq('Title', 'A'), Eq('Done', False), IsNull('Owner')
+        title_xml = '<Eq><FieldRef Name="Title"/><Value Type="Text">A</Value></Eq>'
+        done_xml = '<Eq><FieldRef Name="Done"/><Value Type="Boolean">0</Value></Eq>'
+        owner_xml = '<IsNull><FieldRef Name="Owner"/></IsNull>'
+        self.assertCAML(And(title, done, owner),
+                        '<And>{0}<And>{1}{2}</And></And>'.format(title_xml, done_xml, owner_xml))
+        self.assertCAML(title & (done | owner),
+                        '<And>{0}<Or>{1}{2}</Or></And>'.format(title_xml, done_xml, owner_xml))
+        self.assertCAML((title & done) | owner,
+                        '<Or><And>{0}{1}</And>{2}</Or>'.format(title_xml, done_xml, owner_xml))
+        self.assertRaises(ValueError, Or, title)
+
+    def test_unknown_field(self):
+        self.assertRaises(KeyError, Eq('Missing', 1).as_xml, self.fields)
+
+    def test_query_xml(self):
+        self.assertIsNone(query_xml(self.fields))
+        query = query_xml(self.fields, Eq('ID', 1), ['-Due_x0020_Date', 'Title'])
+        self.assertEqual(etree.tostring(query).decode('utf-8'),
+                         '<Query><Where><Eq><FieldRef Name="ID"/><Value Type="Counter">1</Value></Eq></Where>'
+                         '<OrderBy><FieldRef Name="Due_x0020_Date" Ascending="FALSE"/>'
+                         '<FieldRef Name="Title"/></OrderBy></Query>')
+        # Conditions can also be written by hand
+        where = etree.fromstring('<IsNull><FieldRef Name="Owner"/></IsNull>')
+        self.assertEqual(etree.tostring(query_xml(self.fields, where)).decode('utf-8'),
+                         '<Query><Where><IsNull><FieldRef Name="Owner"/></IsNull></Where></Query>')
+
+
+if __name__ == '__main__':
+    unittest.main()
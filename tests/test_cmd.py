@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from lxml import etree
+
+from sharepoint.cmd import export_lists, list_filenames
+from sharepoint.site import SharePointSite
+from sharepoint.xml import namespaces
+
+from .fakes import FakeOpener
+
+
+class ListFilenamesTestCase(unittest.TestCase):
+    def test_safe(self):
+        self.assertEqual(list_filenames(['Tasks', 'Shared Documents', 'a/b']),
+                         ['Tasks.xml', 'Shared_Documents.xml', 'a_b.xml'])
+
+    def test_collisions_numbered(self):
+        self.assertEqual(list_filenames(['A/B', 'A B', 'a_b', 'A_B_2']),
+                         ['A_B.xml', 'A_B_2.xml', 'a_b_3.xml', 'A_B_2_2.xml'])
+
+
+class ExportListsTestCase(unittest.TestCase):
+    def setUp(self):
+        titles = ['List {0}'.format(i) for i in range(5)] + ['A/B', 'A B']
+        self.opener = FakeOpener(
+            lists=dict((title, [('ID', 'Counter'), ('Title', 'Text')]) for title in titles),
+            rows=dict((title, {1: {'ID': '1', 'Title': title}}) for title in titles),
+            delay=0.02)
+        self.site = SharePointSite('http://example.org/', self.opener)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def export(self, list_names, jobs):
+        export_lists(self.site, self.directory, False,
+                     dict(include_lists=True, list_names=list_names, include_list_data=True,
+                          include_field_definitions=True, jobs=jobs))
+
+    def titles_written(self, filename):
+        tree = etree.parse(os.path.join(self.directory, filename))
+        return tree.xpath('//sharepoint:list/@name', namespaces=namespaces)
+
+    def test_lists_fetched_once(self):
+        list_names = ['List {0}'.format(i) for i in range(5)]
+        self.export(list_names, jobs=6)
+        self.assertEqual(self.opener.calls.count('GetListCollection'), 1)
+        # One for the user information list, and one for each list
+        self.assertEqual(self.opener.calls.count('GetList'), 6)
+        for list_name in list_names:
+            self.assertEqual(self.titles_written(list_name.replace(' ', '_') + '.xml'), [list_name])
+
+    def test_colliding_filenames(self):
+        self.export(['A/B', 'A B'], jobs=2)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['A_B.xml', 'A_B_2.xml'])
+        self.assertEqual(self.titles_written('A_B.xml'), ['A/B'])
+        self.assertEqual(self.titles_written('A_B_2.xml'), ['A B'])
+
+
+if __name__ == '__main__':
+    unittest.main()
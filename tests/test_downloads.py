@@ -0,0 +1,54 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from sharepoint.downloads import download
+
+
+class Response(io.BytesIO):
+    def __init__(self, body):
+        super(Response, self).__init__(body)
+        self.headers = {'ETag': '"1"', 'Content-Length': str(len(body))}
+
+    def getcode(self):
+        return 200
+
+
+class Opener(object):
+    def __init__(self, body):
+        self.body, self.requests = body, []
+
+    def open(self, request):
+        self.requests.append(request)
+        return Response(self.body)
+
+
+class DownloadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        os.chdir(self.directory)
+        self.opener = Opener(b'content')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def test_download_to_bare_filename(self):
+        info = download(self.opener, 'http://example.org/Documents/report.docx', 'report.docx')
+        self.assertEqual(info, {'etag': '"1"', 'last_modified': None, 'size': 7})
+        with open('report.docx', 'rb') as f:
+            self.assertEqual(f.read(), b'content')
+        self.assertEqual(sorted(os.listdir('.')), ['report.docx'])
+
+    def test_download_creates_directories(self):
+        path = os.path.join('a', 'b', 'report.docx')
+        download(self.opener, 'http://example.org/Documents/report.docx', path)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'content')
+
+
+if __name__ == '__main__':
+    unittest.main()
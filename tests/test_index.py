@@ -0,0 +1,99 @@
+import unittest
+
+from sharepoint.site import SharePointSite
+
+from .fakes import ChangesOpener
+
+
+class IndexTestCase(unittest.TestCase):
+    def setUp(self):
+        rows = {}
+        for i in range(1, 6):
+            rows[i] = {'ID': str(i), 'Title': 'Task {0}'.format(i),
+                       'Status': 'Open' if i % 2 else 'Closed',
+                       'Parent': '1;#Task 1' if i > 1 else '',
+                       'Tags': ';#a;#b;#' if i == 5 else ''}
+        self.opener = ChangesOpener(
+            lists={'Tasks': [('ID', 'Counter'), ('Title', 'Text'), ('Status', 'Choice'),
+                             ('Parent', 'Lookup'), ('Tags', 'MultiChoice')]},
+            rows={'Tasks': rows})
+        self.list = SharePointSite('http://example.org/', self.opener).lists['Tasks']
+        self.list.sync()
+        self.by_status = self.list.index_by('Status')
+        self.by_title = self.list.index_by('Title')
+
+    def ids(self, index, key):
+        return sorted(row.id for row in index.get(key, []))
+
+    def assertIndexesCurrent(self):
+        # Each index is as it would be if it were made again from the rows
+        for index in (self.by_status, self.by_title):
+            expected = {}
+            for row in self.list.rows:
+                expected.setdefault(index.key(row), set()).add(row.id)
+            self.assertEqual(dict((key, set(row.id for row in rows)) for key, rows in index.items()), expected)
+
+    def test_index(self):
+        self.assertEqual(self.ids(self.by_status, 'Open'), [1, 3, 5])
+        self.assertEqual(self.ids(self.by_status, 'Closed'), [2, 4])
+        self.assertIs(self.list.index_by('Status'), self.by_status)
+        self.assertRaises(KeyError, self.list.index_by, 'Missing')
+
+    def test_lookups_multiple_values_and_several_fields(self):
+        by_parent = self.list.index_by('Parent')
+        self.assertEqual(self.ids(by_parent, 1), [2, 3, 4, 5])
+        self.assertEqual(self.ids(by_parent, None), [1])
+        by_tags = self.list.index_by('Tags')
+        self.assertEqual(self.ids(by_tags, ('a', 'b')), [5])
+        by_status_and_parent = self.list.index_by('Status', 'Parent')
+        self.assertEqual(self.ids(by_status_and_parent, ('Open', 1)), [3, 5])
+
+    def test_set(self):
+        row = self.list.rows_by_id[2]
+        row.Status = 'Open'
+        self.assertEqual(self.ids(self.by_status, 'Open'), [1, 2, 3, 5])
+        self.assertEqual(self.ids(self.by_status, 'Closed'), [4])
+        row.Tags = ['c']
+        self.assertEqual(self.ids(self.list.index_by('Tags'), ('c',)), [2])
+        self.assertIndexesCurrent()
+
+    def test_append_and_remove(self):
+        row = self.list.append({'Title': 'New', 'Status': 'Closed'})
+        self.assertIn(row, self.by_status['Closed'])
+        self.list.remove(self.list.rows_by_id[4])
+        self.assertEqual(sorted(row.Title for row in self.by_status['Closed']), ['New', 'Task 2'])
+        self.assertIndexesCurrent()
+
+    def test_save(self):
+        self.list.rows_by_id[1].Title = ' Renamed '
+        self.list.append({'Title': 'New', 'Status': 'Closed'})
+        self.list.remove(self.list.rows_by_id[2])
+        self.assertTrue(self.list.save())
+        # Titles come back stripped in the response
+        self.assertEqual(self.ids(self.by_title, 'Renamed'), [1])
+        self.assertNotIn(' Renamed ', self.by_title)
+        self.assertEqual(self.ids(self.by_title, 'New'), [6])
+        self.assertEqual(self.ids(self.by_status, 'Closed'), [4, 6])
+        self.assertIndexesCurrent()
+
+    def test_sync(self):
+        self.opener.change('Tasks', 1, Status='Closed')
+        self.opener.change('Tasks', 6, Title='Added', Status='Open')
+        self.opener.change('Tasks', 2, 'Delete')
+        self.list.sync()
+        self.assertEqual(self.ids(self.by_status, 'Open'), [3, 5, 6])
+        self.assertEqual(self.ids(self.by_status, 'Closed'), [1, 4])
+        self.assertNotIn('Task 2', self.by_title)
+        self.assertIndexesCurrent()
+
+    def test_sync_everything_again(self):
+        self.opener.change('Tasks', 3, Status='Closed')
+        self.opener.change('Tasks', 4, 'Delete')
+        self.opener.expired_before = len(self.opener.log)
+        self.list.sync()
+        self.assertEqual(self.ids(self.by_status, 'Closed'), [2, 3])
+        self.assertIndexesCurrent()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+from six.moves.urllib.error import URLError
+
+from sharepoint.exceptions import UpdateFailedError
+from sharepoint.site import SharePointSite
+
+from .fakes import FakeOpener
+
+
+class UnreachableOpener(FakeOpener):
+    """
+    Fails requests that mention 'unreachable', as if they couldn't be sent.
+    """
+
+    def open(self, request, timeout=None):
+        if b'unreachable' in request.data:
+            raise URLError('Connection refused')
+        return super(UnreachableOpener, self).open(request, timeout)
+
+
+class SaveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opener = UnreachableOpener(
+            lists={'Tasks': [('ID', 'Counter'), ('Title', 'Text')]},
+            rows={'Tasks': dict((i, {'ID': str(i), 'Title': 'Task {0}'.format(i)}) for i in range(1, 7))})
+        self.site = SharePointSite('http://example.org/', self.opener)
+        self.list = self.site.lists['Tasks']
+        self.by_title = self.list.index_by('Title')
+
+    def set_titles(self, titles):
+        for row_id, title in titles.items():
+            self.list.rows_by_id[row_id].Title = title
+
+    def server_titles(self):
+        return dict((row_id, row['Title']) for row_id, row in self.opener.rows['Tasks'].items())
+
+    def test_failed_row_reported_and_others_saved(self):
+        self.set_titles({1: ' One ', 2: 'Two', 3: 'fail', 4: 'Four', 5: 'Five', 6: 'Six'})
+        self.opener.calls = []
+
+        result = self.list.save(chunk_size=2)
+        self.assertFalse(result)
+        self.assertEqual(self.opener.calls.count('UpdateListItems'), 3)
+        self.assertEqual(sorted(row.id for row in result.saved), [1, 2, 4, 5, 6])
+        self.assertEqual(len(result.failed), 1)
+        error = result.failed[0]
+        self.assertIsInstance(error, UpdateFailedError)
+        self.assertEqual((error.row.id, error.update_type, error.code, error.text),
+                         (3, 'Update', '0x81020014', 'Invalid value'))
+
+        self.assertEqual(self.server_titles(), {1: 'One', 2: 'Two', 3: 'Task 3', 4: 'Four', 5: 'Five', 6: 'Six'})
+        # Saved rows are updated, and reindexed, from the response
+        self.assertEqual(self.list.rows_by_id[1].Title, 'One')
+        self.assertEqual(self.by_title['One'], [self.list.rows_by_id[1]])
+        self.assertNotIn(' One ', self.by_title)
+
+        # The failed row keeps its change, and is the only one sent again
+        self.list.rows_by_id[3].Title = 'Three'
+        result = self.list.save(chunk_size=2)
+        self.assertTrue(result)
+        self.assertEqual([row.id for row in result.saved], [3])
+        self.assertEqual(self.server_titles()[3], 'Three')
+        self.assertEqual(self.by_title['Three'], [self.list.rows_by_id[3]])
+
+    def test_failed_request_fails_its_chunk(self):
+        self.set_titles({1: 'One', 2: 'Two', 3: 'unreachable', 4: 'Four', 5: 'Five'})
+
+        result = self.list.save(chunk_size=2)
+        self.assertEqual(sorted(row.id for row in result.saved), [1, 2, 5])
+        self.assertEqual(sorted((error.row.id, error.code) for error in result.failed),
+                         [(3, 'URLError'), (4, 'URLError')])
+        self.assertEqual(self.server_titles(), {1: 'One', 2: 'Two', 3: 'Task 3', 4: 'Task 4', 5: 'Five', 6: 'Task 6'})
+        self.assertEqual(self.site.stats()['UpdateListItems']['errors'], 1)
+
+    def test_new_and_deleted_rows(self):
+        self.list.append({'Title': 'New'})
+        self.list.rows_by_id[2].delete()
+        self.list.rows_by_id[4].Title = 'fail'
+
+        result = self.list.save()
+        self.assertEqual(len(result.failed), 1)
+        new_row = [row for row in result.saved if row.Title == 'New'][0]
+        self.assertEqual(new_row.id, 7)
+        self.assertIs(self.list.rows_by_id[7], new_row)
+        self.assertNotIn(2, self.opener.rows['Tasks'])
+        self.assertNotIn(2, self.list.rows_by_id)
+        self.assertEqual(self.by_title['New'], [new_row])
+        self.assertNotIn('Task 2', self.by_title)
+        # Nothing is left to save but the failed row
+        self.opener.calls = []
+        self.assertEqual(len(self.list.save().failed), 1)
+        self.assertEqual(self.opener.calls, ['UpdateListItems'])
+
+
+if __name__ == '__main__':
+    unittest.main()
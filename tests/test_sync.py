@@ -0,0 +1,107 @@
+import unittest
+
+from sharepoint.site import SharePointSite
+
+from .fakes import ChangesOpener
+
+
+class SyncTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opener = ChangesOpener(
+            lists={'Tasks': [('ID', 'Counter'), ('Title', 'Text')]},
+            rows={'Tasks': dict((i, {'ID': str(i), 'Title': 'Task {0}'.format(i)}) for i in range(1, 6))})
+        self.list = self.new_list()
+
+    def new_list(self):
+        return SharePointSite('http://example.org/', self.opener).lists['Tasks']
+
+    def titles(self, rows=None):
+        return dict((row.id, row.Title) for row in (self.list.rows if rows is None else rows))
+
+    def test_first_sync_fetches_every_row_a_page_at_a_time(self):
+        changed_rows, deleted_ids = self.list.sync(page_size=2)
+        self.assertEqual(sorted(row.id for row in changed_rows), [1, 2, 3, 4, 5])
+        self.assertEqual(deleted_ids, set())
+        self.assertEqual(self.opener.calls.count('GetListItems'), 3)
+        self.assertEqual(self.list.change_token, '0')
+        self.assertEqual(len(self.list.rows), 5)
+
+    def test_changes_applied(self):
+        self.list.sync()
+        row = self.list.rows_by_id[2]
+        self.opener.change('Tasks', 2, Title='Changed')
+        self.opener.change('Tasks', 6, Title='Added')
+        self.opener.change('Tasks', 3, 'Delete')
+        self.opener.calls = []
+
+        changed_rows, deleted_ids = self.list.sync()
+        self.assertEqual(self.titles(changed_rows), {2: 'Changed', 6: 'Added'})
+        self.assertEqual(deleted_ids, {3})
+        self.assertEqual(self.titles(), {1: 'Task 1', 2: 'Changed', 4: 'Task 4', 5: 'Task 5', 6: 'Added'})
+        # Rows are updated in place
+        self.assertIs(self.list.rows_by_id[2], row)
+        self.assertEqual(self.list.change_token, '3')
+        self.assertNotIn('GetListItems', self.opener.calls)
+
+    def test_changes_paged(self):
+        self.list.sync()
+        for i in range(1, 6):
+            self.opener.change('Tasks', i, Title='Changed {0}'.format(i))
+        self.opener.calls = []
+
+        changed_rows, deleted_ids = self.list.sync(page_size=2)
+        self.assertEqual(len(changed_rows), 5)
+        self.assertEqual(self.opener.calls.count('GetListItemChangesSinceToken'), 3)
+        self.assertEqual(self.list.change_token, '5')
+        self.assertEqual(self.titles()[5], 'Changed 5')
+
+    def test_resume_from_token(self):
+        self.list.sync()
+        token = self.list.change_token
+        self.opener.change('Tasks', 4, Title='Changed')
+        self.opener.change('Tasks', 5, 'Delete')
+
+        # As if in another process, with only the token kept
+        other = self.new_list()
+        self.opener.calls = []
+        changed_rows, deleted_ids = other.sync(token=token)
+        self.assertEqual(self.titles(changed_rows), {4: 'Changed'})
+        self.assertEqual(deleted_ids, {5})
+        self.assertEqual(other.change_token, '2')
+        self.assertNotIn('GetListItems', self.opener.calls)
+
+    def test_rows_without_values_refetched(self):
+        self.list.sync()
+        self.opener.rows['Tasks'][2]['Title'] = 'Renamed'
+        self.opener.change('Tasks', 2, 'Rename')
+        self.opener.rows['Tasks'][7] = {'ID': '7', 'Title': 'Restored'}
+        self.opener.change('Tasks', 7, 'Restore')
+        self.opener.change('Tasks', 8, 'Restore')
+        self.opener.change('Tasks', 1, 'MoveAway')
+        self.opener.calls = []
+
+        changed_rows, deleted_ids = self.list.sync()
+        self.assertEqual(self.titles(changed_rows), {2: 'Renamed', 7: 'Restored'})
+        # Row 8 was restored and then deleted again, so couldn't be refetched
+        self.assertEqual(deleted_ids, {1, 8})
+        self.assertEqual(self.titles(), {2: 'Renamed', 3: 'Task 3', 4: 'Task 4', 5: 'Task 5', 7: 'Restored'})
+        # All fetched with one query
+        self.assertEqual(self.opener.calls.count('GetListItems'), 1)
+
+    def test_expired_token_refetches_everything(self):
+        self.list.sync()
+        self.opener.change('Tasks', 2, Title='Changed')
+        self.opener.change('Tasks', 3, 'Delete')
+        self.opener.expired_before = 2
+        self.opener.calls = []
+
+        changed_rows, deleted_ids = self.list.sync()
+        self.assertEqual(self.titles(changed_rows), {1: 'Task 1', 2: 'Changed', 4: 'Task 4', 5: 'Task 5'})
+        self.assertEqual(deleted_ids, set())
+        self.assertEqual(self.titles(), self.titles(changed_rows))
+        self.assertEqual(self.list.change_token, '2')
+        self.assertEqual(self.opener.calls.count('GetListItems'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
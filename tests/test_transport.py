@@ -0,0 +1,80 @@
+import threading
+import unittest
+
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.request import Request, build_opener
+
+from sharepoint.transport import KEEP_ALIVE_SUPPORTED, ConnectionPool, KeepAliveHandler
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        body = b'hello'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.path == '/close':
+            # Drop the connection without saying so, as a server does when a
+            # kept-alive connection has been idle for too long.
+            self.close_connection = True
+
+    def do_POST(self):
+        self.server.connections.add(self.client_address)
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+@unittest.skipUnless(KEEP_ALIVE_SUPPORTED, "KeepAliveHandler isn't supported on this version of Python")
+class KeepAliveHandlerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.server.connections = set()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{0}/'.format(self.server.server_address[1])
+        self.pool = ConnectionPool()
+        self.opener = build_opener(KeepAliveHandler(self.pool))
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reused(self):
+        for i in range(5):
+            self.assertEqual(self.opener.open(self.url).read(), b'hello')
+            self.assertEqual(self.opener.open(self.url, data=b'data').read(), b'data')
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_unread_response_not_reused(self):
+        response = self.opener.open(self.url)
+        response.read(1)
+        response.close()
+        self.opener.open(self.url).read()
+        self.assertEqual(len(self.server.connections), 2)
+
+    def test_stale_connection_retried(self):
+        self.assertEqual(self.opener.open(self.url + 'close').read(), b'hello')
+        request = Request(self.url, data=b'data')
+        self.assertEqual(self.opener.open(request).read(), b'data')
+        self.assertEqual(request.retries, 1)
+        self.assertEqual(len(self.server.connections), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
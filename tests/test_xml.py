@@ -0,0 +1,78 @@
+import io
+import unittest
+
+from lxml import etree
+
+from sharepoint.site import SharePointSite
+from sharepoint.xml import OUT, XMLWriter
+
+from .fakes import FakeOpener
+
+
+def write(writer, element, depth):
+    """
+    Writes element with writer, opening it and the elements within it as
+    containers down to depth, and writing those below whole.
+    """
+    if depth == 0:
+        writer.write(element)
+        return
+    children = list(element)
+    for child in children:
+        element.remove(child)
+    with writer.element(element):
+        for child in children:
+            write(writer, child, depth - 1)
+
+
+class XMLWriterTestCase(unittest.TestCase):
+    def tree(self):
+        return OUT.site(
+            OUT.lists(
+                OUT.list(
+                    OUT.fields(OUT.field(name='Title', type='Text'), OUT.field(name='ID', type='Counter')),
+                    OUT.rows(*(OUT.row(OUT.fields(OUT.field(u'Row \u2603 & <{0}>'.format(i), name='Title')),
+                                       id=str(i))
+                               for i in range(3))),
+                    name='Tasks'),
+                OUT.list(OUT.rows(), name='Empty'),
+                OUT.list(name='No rows')),
+            OUT.users(),
+            url='http://example.org/')
+
+    def assertWrittenAsTostring(self, depth, pretty_print):
+        expected = etree.tostring(self.tree(), pretty_print=pretty_print)
+        out = io.BytesIO()
+        write(XMLWriter(out, pretty_print=pretty_print), self.tree(), depth)
+        self.assertEqual(out.getvalue(), expected)
+
+    def test_same_as_tostring(self):
+        for pretty_print in (False, True):
+            for depth in range(1, 6):
+                self.assertWrittenAsTostring(depth, pretty_print)
+
+    def test_empty_root(self):
+        for pretty_print in (False, True):
+            out = io.BytesIO()
+            with XMLWriter(out, pretty_print=pretty_print).element(OUT.site(url='http://example.org/')):
+                pass
+            self.assertEqual(out.getvalue(), etree.tostring(OUT.site(url='http://example.org/'),
+                                                            pretty_print=pretty_print))
+
+    def test_site_write_xml_same_as_as_xml(self):
+        opener = FakeOpener(
+            lists={'Tasks': [('ID', 'Counter'), ('Title', 'Text'), ('Done', 'Boolean')],
+                   'Empty': [('ID', 'Counter'), ('Title', 'Text')]},
+            rows={'Tasks': dict((i, {'ID': str(i), 'Title': 'Task {0}'.format(i), 'Done': '1'})
+                                for i in range(1, 4)),
+                  'Empty': {}})
+        site = SharePointSite('http://example.org/', opener)
+        kwargs = dict(include_lists=True, list_names=['Tasks', 'Empty'])
+        for pretty_print in (False, True):
+            out = io.BytesIO()
+            site.write_xml(XMLWriter(out, pretty_print=pretty_print), **kwargs)
+            self.assertEqual(out.getvalue(), etree.tostring(site.as_xml(**kwargs), pretty_print=pretty_print))
+
+
+if __name__ == '__main__':
+    unittest.main()